@@ -0,0 +1,128 @@
+import os
+import threading
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+from database import (
+    get_connection,
+    file_fingerprint,
+    load_table_metadata,
+    save_table_metadata,
+)
+
+LOOKUP_COLUMNS = ["Table Name", "Table Alias", "Column Name", "Column Alias"]
+
+
+def build_alias_mapping(lookup):
+    """
+    Build the alias mapping from the rows of the lookup tables: real table names
+    map to their alias and real-to-alias column names, alias table names map to
+    their real name and alias-to-real column names.
+    """
+    # Rows without table names cannot be looked up
+    lookup = lookup.dropna(subset=["Table Name", "Table Alias"])
+    real_tables = lookup["Table Name"].to_numpy(dtype=object)
+    alias_tables = lookup["Table Alias"].to_numpy(dtype=object)
+    real_columns = lookup["Column Name"].to_numpy(dtype=object)
+    alias_columns = lookup["Column Alias"].to_numpy(dtype=object)
+
+    # Both directions of every row, interleaved in row order so later rows win
+    # like they do when the mapping is filled row by row
+    pairs = pd.DataFrame(
+        {
+            "table": np.column_stack([real_tables, alias_tables]).ravel(),
+            "key": np.column_stack([real_columns, alias_columns]).ravel(),
+            "value": np.column_stack([alias_columns, real_columns]).ravel(),
+        }
+    )
+
+    alias_map = {
+        table: {"columns": dict(zip(group["key"], group["value"]))}
+        for table, group in pairs.groupby("table", sort=False)
+    }
+    # The first row of a table gives its alias or real name
+    first_real = lookup.drop_duplicates("Table Name")
+    for real_table, alias_table in zip(
+        first_real["Table Name"], first_real["Table Alias"]
+    ):
+        alias_map[real_table]["alias"] = alias_table
+    first_alias = lookup.drop_duplicates("Table Alias")
+    for alias_table, real_table in zip(
+        first_alias["Table Alias"], first_alias["Table Name"]
+    ):
+        alias_map[alias_table]["real"] = real_table
+    return alias_map
+
+
+def freeze_alias_mapping(alias_map):
+    """Return a read-only view of an alias mapping and its nested dictionaries."""
+    return MappingProxyType(
+        {
+            table: MappingProxyType(
+                {**entry, "columns": MappingProxyType(entry.get("columns", {}))}
+            )
+            for table, entry in alias_map.items()
+        }
+    )
+
+
+class AliasRegistry:
+    """
+    Table and column aliases of the lookup database, shared by all threads.
+
+    The mapping is published as a read-only snapshot that is replaced as a whole,
+    so readers taking `mapping` once see a consistent version without locking.
+    Snapshots are built for one version of lookup.db3 and its set of lookup
+    tables, and persisted with the table metadata so a restart does not read
+    the lookup tables again.
+    """
+
+    def __init__(self):
+        # (version, mapping), replaced in a single assignment
+        self._snapshot = (None, freeze_alias_mapping({}))
+        self._lock = threading.Lock()
+
+    @property
+    def mapping(self):
+        """The current read-only alias mapping."""
+        return self._snapshot[1]
+
+    def load(self, lookup_path, db_paths):
+        """
+        Publish the alias mapping of the lookup tables of the databases, unless
+        it is already published for the current version of lookup.db3.
+        """
+        tables = sorted(
+            {os.path.basename(path).replace(".db3", "") for path in db_paths}
+        )
+        version = (file_fingerprint([lookup_path]), tuple(tables))
+        current_version, mapping = self._snapshot
+        if version == current_version:
+            return mapping
+
+        # Concurrent first requests wait for one build instead of racing
+        with self._lock:
+            current_version, mapping = self._snapshot
+            if version == current_version:
+                return mapping
+
+            metadata_key = "alias_mapping:" + ",".join(tables)
+            alias_map = load_table_metadata(lookup_path, metadata_key)
+            if alias_map is None:
+                conn = get_connection(lookup_path)
+                columns = ", ".join(f'"{col}"' for col in LOOKUP_COLUMNS)
+                frames = [
+                    pd.read_sql_query(f"SELECT {columns} FROM '{table}'", conn)
+                    for table in tables
+                ]
+                lookup = (
+                    pd.concat(frames, ignore_index=True)
+                    if frames
+                    else pd.DataFrame(columns=LOOKUP_COLUMNS)
+                )
+                alias_map = build_alias_mapping(lookup)
+                save_table_metadata(lookup_path, metadata_key, alias_map)
+
+            mapping = freeze_alias_mapping(alias_map)
+            self._snapshot = (version, mapping)
+            return mapping
@@ -5,28 +5,44 @@ from routes import register_routes
 from error_handlers import register_error_handlers
 from dotenv import load_dotenv
 import os
-import shutil
 from config import Config
-
-if os.path.exists(Config.TEMPDIR):
-    shutil.rmtree(Config.TEMPDIR)
+from response_cache import SharedLRUCache
+from warmup import start_warmup
 
 os.makedirs(Config.TEMPDIR, exist_ok=True)
 
+# Converted geospatial files now live in the size-capped geospatial cache, remove
+# the per-file outputs written to TEMPDIR by earlier versions
+for name in os.listdir(Config.TEMPDIR):
+    if name.endswith(("_output.geojson", "_reprojected.tif", "_rendered.png")):
+        os.remove(os.path.join(Config.TEMPDIR, name))
+
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-# Configure caching
-cache = Cache(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 300})
+# Configure caching, shared by the worker processes and bounded by bytes
+cache = Cache(
+    app,
+    config={
+        "CACHE_TYPE": f"{SharedLRUCache.__module__}.{SharedLRUCache.__name__}",
+        "CACHE_DEFAULT_TIMEOUT": 300,
+        "CACHE_DIR": os.path.join(Config.TEMPDIR, "ResponseCache"),
+        "CACHE_MAX_BYTES": Config.RESPONSE_CACHE_MAX_BYTES,
+        "CACHE_SPILL_BYTES": Config.RESPONSE_CACHE_SPILL_BYTES,
+    },
+)
 
 # Register routes and error handlers
 register_routes(app, cache)
 register_error_handlers(app)
 
 if __name__ == "__main__":
+    # Progress is reported by /api/ready while the server answers requests
+    start_warmup()
+
     if os.getenv("PRODUCTION") == "True":
         from waitress import serve
 
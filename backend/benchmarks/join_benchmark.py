@@ -0,0 +1,122 @@
+"""
+Benchmark joining several tables in SQLite against the pandas merge of get_data.
+The SQL join is not used by get_data: with one (ID, date) index search per table
+and key it is at best as fast as the concurrent fetch and merge, and slower on
+long date ranges.
+
+Run from the backend folder: python benchmarks/join_benchmark.py [ids] [years] [tables]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from config import Config
+from database import advise_indexes, close_connections, get_attached_connection
+from services import fetch_data_from_db
+
+
+def build_databases(folder, ids, years, tables):
+    """Build one indexed daily output database per table, each missing some rows."""
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("1990-01-01", periods=365 * years, freq="D").strftime(
+        "%Y-%m-%d"
+    )
+    for i in range(tables):
+        df = pd.DataFrame(
+            {
+                "ID": np.repeat(np.arange(1, ids + 1), len(dates)),
+                "Time": np.tile(dates, ids),
+                f"Value{i}": rng.random(ids * len(dates)),
+            }
+        )
+        # Each table lacks different rows so the outer join has unmatched keys
+        df = df[rng.random(len(df)) > 0.05]
+        db_path = os.path.join(folder, f"Table{i}.db3")
+        conn = sqlite3.connect(db_path)
+        df.to_sql(f"Table{i}", conn, index=False)
+        conn.close()
+        advise_indexes(db_path)
+
+
+def merge_in_pandas(table_plans):
+    """Fetch every table and outer-merge them on ID and date like get_data_service."""
+    df = pd.DataFrame()
+    for plan in table_plans:
+        df_temp = fetch_data_from_db(
+            plan["table"]["db"],
+            plan["table"]["table"],
+            [],
+            plan["fetch_columns"],
+            None,
+            None,
+            "Time",
+        )
+        df = df_temp if df.empty else pd.merge(df, df_temp, on=["ID", "Time"], how="outer")
+    return df
+
+
+def join_in_sqlite(folder, tables):
+    """
+    Outer-join the tables over the attached databases, left-joining each table
+    to the union of their (ID, date) keys.
+    """
+    keys = " UNION ".join(
+        f'SELECT "ID", "Time" FROM db{i}."Table{i}"' for i in range(tables)
+    )
+    joins = " ".join(
+        f'LEFT JOIN db{i}."Table{i}" t{i} ON t{i}."ID" = k.id_key '
+        f'AND t{i}."Time" = k.date_key'
+        for i in range(tables)
+    )
+    values = ", ".join(f't{i}."Value{i}" AS "Value{i}"' for i in range(tables))
+    query = (
+        f"WITH k(id_key, date_key) AS ({keys}) "
+        f'SELECT k.id_key AS "ID", k.date_key AS "Time", {values} '
+        f"FROM k {joins} ORDER BY 1, 2"
+    )
+    conn = get_attached_connection(
+        [os.path.join(folder, f"Table{i}.db3") for i in range(tables)]
+    )
+    return pd.read_sql_query(query, conn)
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    ids = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    tables = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    with tempfile.TemporaryDirectory() as folder:
+        build_databases(folder, ids, years, tables)
+        Config.PATHFILE = folder
+        table_plans = [
+            {
+                "table": {"db": f"Table{i}.db3", "table": f"Table{i}"},
+                "fetch_columns": ["ID", "Time", f"Value{i}"],
+                "duplicate_columns": [],
+            }
+            for i in range(tables)
+        ]
+
+        merged, merged_time = time_call(merge_in_pandas, table_plans)
+        joined, joined_time = time_call(join_in_sqlite, folder, tables)
+        close_connections()
+
+    # Both must produce the same rows in the same order
+    pd.testing.assert_frame_equal(merged.reset_index(drop=True), joined)
+
+    print(f"Tables: {tables}, IDs: {ids}, years: {years}, rows: {len(joined)}")
+    print(f"Pandas merge: {merged_time:.3f} s")
+    print(f"SQLite join:  {joined_time:.3f} s")
@@ -0,0 +1,64 @@
+"""
+Benchmark the column-wise rounding engine against the previous per-cell apply.
+
+Run from the backend folder: python benchmarks/rounding_benchmark.py [rows]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from services import round_df_except_latlon, round_numeric_values
+
+
+def round_df_per_cell(df):
+    """Previous implementation, calling round_numeric_values once per cell."""
+    skip_cols = {"latitude", "longitude"}
+    return df.apply(
+        lambda col: (
+            col if col.name.lower() in skip_cols else col.apply(round_numeric_values)
+        )
+    )
+
+
+def build_frame(rows):
+    """Build a daily subarea-like frame with small, large and missing values."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "ID": rng.integers(1, 500, rows),
+            "Date": pd.date_range("1990-01-01", periods=rows, freq="h").strftime(
+                "%Y-%m-%d"
+            ),
+            "Runoff": rng.normal(10, 5, rows),
+            "Sediment": rng.random(rows) * 0.02,
+            "Nitrogen": np.where(rng.random(rows) < 0.1, np.nan, rng.random(rows)),
+            "Latitude": rng.random(rows) * 90,
+        }
+    )
+
+
+def time_call(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = build_frame(rows)
+
+    per_cell, per_cell_time = time_call(round_df_per_cell, df)
+    vectorized, vectorized_time = time_call(round_df_except_latlon, df)
+
+    # Both engines must produce identical values
+    pd.testing.assert_frame_equal(per_cell, vectorized, check_exact=True)
+
+    print(f"Rows: {rows}")
+    print(f"Per-cell apply: {per_cell_time:.3f} s")
+    print(f"Vectorized:     {vectorized_time:.3f} s")
+    print(f"Speedup:        {per_cell_time / vectorized_time:.1f}x")
@@ -0,0 +1,45 @@
+import os
+import json
+from werkzeug.utils import safe_join
+from config import Config
+from database import file_fingerprint
+from validate import canonical_request_args
+
+
+def request_data_files(args, bmp_db_path=None):
+    """
+    Return the data files a request with these arguments reads its results from.
+    bmp_db_path is the BMPs.db3 the field scale data queries read.
+    """
+    paths = []
+    try:
+        if "db_tables" in args:
+            paths += [table["db"] for table in json.loads(args["db_tables"])]
+            # Alias names and Help attributes change the results of data queries
+            paths += [Config.LOOKUP, os.path.join(Config.BASE_DIR, "Help.db3")]
+            if args.get("spatial_scale", None) == "field" and bmp_db_path:
+                paths.append(bmp_db_path)
+        if "db_path" in args:
+            paths += [args["db_path"], Config.LOOKUP]
+        if "file_paths" in args:
+            paths += json.loads(args["file_paths"])
+    except (ValueError, TypeError, KeyError):
+        # Invalid arguments are answered with a validation error
+        pass
+    files = [
+        path if os.path.isabs(path) else safe_join(Config.PATHFILE, path)
+        for path in paths
+        if path
+    ]
+    return list(dict.fromkeys(file for file in files if file))
+
+
+def response_cache_key(path, args, bmp_db_path=None):
+    """
+    Build the response cache key of a request from its canonical arguments and the
+    version (mtime and size) of the files it reads, so cached responses never need
+    to expire: a changed file gives new keys. Returns the key and the files.
+    """
+    files = request_data_files(args, bmp_db_path)
+    query = canonical_request_args(args)
+    return f"view/{path}?{query}@{file_fingerprint(files)}", files
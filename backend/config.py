@@ -28,4 +28,44 @@ class Config:
     )
     LOOKUP = "Jenette_Creek_Watershed/Database/lookup.db3"
     TEMPDIR = os.path.join(user_data_dir("Temp", False), "TempFiles")
+    # Persistent caches, kept across restarts unlike TEMPDIR
+    CACHE_DIR = os.path.join(user_data_dir("Temp", False), "Cache")
+    # Converted GeoJSON, reprojected rasters and rendered images, bounded by size
+    GEO_CACHE_DIR = os.path.join(CACHE_DIR, "Geospatial")
+    GEO_CACHE_MAX_BYTES = int(
+        os.environ.get("GEO_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+    )
+    # Bounds the manifest too, tiles outside a layer are empty files
+    GEO_CACHE_MAX_ENTRIES = int(os.environ.get("GEO_CACHE_MAX_ENTRIES", 200000))
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # 256 MB memory-mapped reads
+    SQLITE_CACHE_SIZE = -64 * 1024  # 64 MB page cache (negative value is KiB)
+    STREAM_CHUNK_SIZE = 50000  # Rows read per chunk when streaming query results
+    # Smaller JSON results are sent whole, so they are kept in the caches
+    STREAM_MIN_ROWS = int(os.environ.get("STREAM_MIN_ROWS", 200000))
+    # Threads fetching the tables of a multi-table request concurrently
+    FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", 4))
+    # Create ID/date indexes in discovered and converted databases
+    AUTO_INDEX = os.environ.get("AUTO_INDEX", "True") == "True"
+    # Seconds without reads before a discovered database is indexed
+    INDEX_IDLE_SECONDS = float(os.environ.get("INDEX_IDLE_SECONDS", 10))
+    # Seconds a read waits for a database locked by a writer
+    SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 30))
+    # Discover, scan and convert the default watershed in the background at start
+    WARMUP = os.environ.get("WARMUP", "True") == "True"
+    WARMUP_FOLDER = os.environ.get("WARMUP_FOLDER", "Jenette_Creek_Watershed")
+    WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", 2))
+    # Threads used by GDAL to reproject rasters (a number or ALL_CPUS)
+    WARP_THREADS = os.environ.get("WARP_THREADS", "ALL_CPUS")
+    # Response cache shared by the worker processes, bounded by the size of the cached values
+    RESPONSE_CACHE_MAX_BYTES = int(
+        os.environ.get("RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    )
+    # Memory used by the query results shared between the data, color and export requests
+    QUERY_RESULT_MAX_BYTES = int(
+        os.environ.get("QUERY_RESULT_MAX_BYTES", 512 * 1024 * 1024)
+    )
+    # Responses larger than this are spilled to separate files (0 keeps them in the index)
+    RESPONSE_CACHE_SPILL_BYTES = (
+        int(os.environ.get("RESPONSE_CACHE_SPILL_BYTES", 1024 * 1024)) or None
+    )
     BASE_DIR = "//int.ec.gc.ca/shares/M/MSC&ONT/Strategic Integration Office/GLHP/Nutrients/FEI_LakeErie_Streams/FEI_Databases/Databases"
\ No newline at end of file
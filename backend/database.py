@@ -0,0 +1,482 @@
+import os
+import re
+import json
+import sqlite3
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from config import Config
+
+# Per-thread pool of read-only connections, keyed by the database path. A pool is
+# released with its thread.
+_local = threading.local()
+# Number of times each database was about to be replaced, and in total. Every
+# thread closes its connections opened before a replacement on its next checkout.
+_replacements = {}
+_replacements_total = 0
+_replacements_lock = threading.Lock()
+
+# SQLite's default limit on the number of attached databases
+MAX_ATTACHED = 10
+
+# Date columns in the order the services look them up
+DATE_COLUMNS = ["Time", "Date", "Month", "Year"]
+
+# Index advice results per database path, and the file signature they were made for
+index_reports = {}
+# Last time each database was read, the advice waits until the file is idle
+_last_read = {}
+# (signature after, signature before) of the databases the advice wrote indexes to,
+# the data is unchanged so the caches keep using the signature before. Persisted in
+# the sidecar cache database, as the caches keyed by the signature before are.
+_unchanged_signatures = {}
+_unchanged_loaded = False
+# Databases being written (uploaded or imported) and being indexed, the advice
+# skips the first and writers wait for the second
+_writing = {}
+_advising = set()
+_index_lock = threading.Condition()
+_index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index_advisor")
+
+# Table metadata for the current file versions, backed by the sidecar cache database
+_metadata_memory = {}
+_metadata_lock = threading.Lock()
+
+
+def _file_signature(db_path):
+    """Return the (mtime, size) pair used to detect a changed database file."""
+    if not _unchanged_loaded:
+        _load_unchanged_signatures()
+    stat = os.stat(db_path)
+    signature = stat.st_mtime_ns, stat.st_size
+    unchanged = _unchanged_signatures.get(normalize_path(db_path))
+    if unchanged and unchanged[0] == signature:
+        # Only indexes were added since the signature before
+        return unchanged[1]
+    return signature
+
+
+def normalize_path(path):
+    """Normalize a path for use as a cache or pool key."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def file_fingerprint(paths):
+    """
+    Hash the mtime and size of the files, so the fingerprint changes whenever
+    one of them is rewritten. Missing files are part of the fingerprint too.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(set(map(normalize_path, paths))):
+        try:
+            mtime_ns, size = _file_signature(path)
+            digest.update(f"{path}|{mtime_ns}|{size}\n".encode())
+        except OSError:
+            digest.update(f"{path}|missing\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _read_only_uri(db_path):
+    """Build a read-only SQLite URI for local, Windows drive and UNC paths."""
+    path = os.path.abspath(db_path).replace("\\", "/")
+    if not path.startswith("/"):
+        # Windows drive letter paths need a leading slash (file:///C:/...)
+        path = "/" + path
+    return f"file://{quote(path, safe='/:')}?mode=ro"
+
+
+def _apply_pragmas(conn, schemas=("main",)):
+    """Apply the read-only pragmas and the per-schema cache sizes."""
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    for schema in schemas:
+        conn.execute(f"PRAGMA {schema}.mmap_size = {int(Config.SQLITE_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA {schema}.cache_size = {int(Config.SQLITE_CACHE_SIZE)}")
+
+
+def _open_connection(db_path):
+    """Open a read-only connection with pragmas tuned for analytical reads."""
+    conn = sqlite3.connect(
+        _read_only_uri(db_path), uri=True, timeout=Config.SQLITE_BUSY_TIMEOUT
+    )
+    _apply_pragmas(conn)
+    return conn
+
+
+def _open_attached_connection(db_paths):
+    """Open an in-memory connection with every database attached read-only as db0, db1, ..."""
+    conn = sqlite3.connect(":memory:", uri=True, timeout=Config.SQLITE_BUSY_TIMEOUT)
+    schemas = [f"db{i}" for i in range(len(db_paths))]
+    for schema, db_path in zip(schemas, db_paths):
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (_read_only_uri(db_path),))
+    _apply_pragmas(conn, schemas)
+    return conn
+
+
+def _key_paths(key):
+    # Attached connections are keyed by ("attached", path, ...)
+    return key[1:] if isinstance(key, tuple) else (key,)
+
+
+def _replacement_counts(key):
+    return tuple(_replacements.get(path, 0) for path in _key_paths(key))
+
+
+def _close_replaced(pool):
+    """Close the connections of a pool opened before their database was replaced."""
+    _local.replacements_seen = _replacements_total
+    for key, (conn, _, replacements) in list(pool.items()):
+        if replacements != _replacement_counts(key):
+            del pool[key]
+            conn.close()
+
+
+def _pooled_connection(key, signature, open_connection):
+    """Return the current thread's connection for key, reopening it if the signature changed."""
+    pool = getattr(_local, "connections", None)
+    if pool is None:
+        pool = _local.connections = {}
+        _local.replacements_seen = _replacements_total
+    if _local.replacements_seen != _replacements_total:
+        _close_replaced(pool)
+
+    entry = pool.get(key)
+    if entry is not None:
+        conn, conn_signature, _ = entry
+        if conn_signature == signature:
+            return conn
+        # The database changed on disk, drop the stale connection
+        conn.close()
+
+    replacements = _replacement_counts(key)
+    conn = open_connection()
+    pool[key] = (conn, signature, replacements)
+    return conn
+
+
+def get_connection(db_path):
+    """
+    Get a pooled read-only connection to a SQLite database for the current thread.
+    The connection is reopened when the file's mtime or size changes.
+    Pooled connections must not be closed by the caller.
+    """
+    key = normalize_path(db_path)
+    _last_read[key] = time.monotonic()
+    return _pooled_connection(
+        key,
+        _file_signature(db_path),
+        lambda: _open_connection(db_path),
+    )
+
+
+def get_attached_connection(db_paths):
+    """
+    Get a pooled connection with the databases attached read-only as db0, db1, ...
+    in the given order, for queries that join tables across database files.
+    """
+    if len(db_paths) > MAX_ATTACHED:
+        raise ValueError(f"Cannot attach more than {MAX_ATTACHED} databases")
+
+    paths = tuple(normalize_path(p) for p in db_paths)
+    for path in paths:
+        _last_read[path] = time.monotonic()
+    return _pooled_connection(
+        ("attached",) + paths,
+        tuple(_file_signature(p) for p in db_paths),
+        lambda: _open_attached_connection(db_paths),
+    )
+
+
+def close_connections():
+    """Close all pooled connections owned by the current thread."""
+    pool = getattr(_local, "connections", None) or {}
+    for conn, _, _ in pool.values():
+        conn.close()
+    pool.clear()
+
+
+def close_pooled_connections(db_paths):
+    """
+    Close the current thread's pooled connections to the databases before they
+    are overwritten, and mark those of the other threads as replaced, so they are
+    closed by their own thread on its next checkout instead of under a running
+    query. Open connections keep the file memory-mapped, and Windows cannot
+    replace or truncate a mapped file.
+    """
+    global _replacements_total
+    with _replacements_lock:
+        for path in {normalize_path(path) for path in db_paths}:
+            _replacements[path] = _replacements.get(path, 0) + 1
+        _replacements_total += 1
+    pool = getattr(_local, "connections", None)
+    if pool is not None:
+        _close_replaced(pool)
+
+
+def _existing_index_columns(conn, table_name):
+    """Return the column tuples of all indexes on a table."""
+    index_columns = []
+    for index in conn.execute(f"PRAGMA index_list('{table_name}')").fetchall():
+        columns = conn.execute(f"PRAGMA index_info('{index[1]}')").fetchall()
+        index_columns.append(tuple(col[2] for col in columns))
+    return index_columns
+
+
+def advise_indexes(db_path):
+    """
+    Create the indexes used by the data queries on every table of a database:
+    a composite (ID, date) index for ID and date range filters and a date index
+    for date ranges and MIN/MAX lookups. Runs ANALYZE when anything was created.
+    Returns a report of the indexes created or already present.
+    """
+    report = {"indexes": [], "analyzed": False, "error": None}
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        tables = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+        ]
+
+        created = False
+        for table_name in tables:
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info('{table_name}')")]
+            id_column = next((col for col in columns if "ID" in col), None)
+            date_column = next((col for col in DATE_COLUMNS if col in columns), None)
+
+            wanted = []
+            if id_column and date_column:
+                wanted.append((id_column, date_column))
+            elif id_column:
+                wanted.append((id_column,))
+            if date_column:
+                wanted.append((date_column,))
+
+            existing = _existing_index_columns(conn, table_name)
+            for index_columns in wanted:
+                # An index starting with the same columns already serves the queries
+                present = any(
+                    cols[: len(index_columns)] == index_columns for cols in existing
+                )
+                index_name = re.sub(
+                    r"\W", "_", f"idx_{table_name}_{'_'.join(index_columns)}"
+                )
+                if not present:
+                    column_list = ", ".join(f'"{col}"' for col in index_columns)
+                    conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column_list})'
+                    )
+                    created = True
+                report["indexes"].append(
+                    {
+                        "table": table_name,
+                        "columns": list(index_columns),
+                        "created": not present,
+                    }
+                )
+
+        has_statistics = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()
+        if created or (report["indexes"] and not has_statistics):
+            conn.execute("ANALYZE")
+            report["analyzed"] = True
+        conn.commit()
+    except sqlite3.Error as e:
+        # Read-only shares or locked databases are reported and queried unindexed
+        report["error"] = str(e)
+    finally:
+        if conn:
+            conn.close()
+    return report
+
+
+def _load_unchanged_signatures():
+    global _unchanged_loaded
+    try:
+        conn = _metadata_cache_connection()
+        try:
+            rows = conn.execute("SELECT * FROM unchanged_signatures").fetchall()
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        rows = []
+    for db_path, mtime_ns, size, before_mtime_ns, before_size in rows:
+        _unchanged_signatures.setdefault(
+            db_path, ((mtime_ns, size), (before_mtime_ns, before_size))
+        )
+    _unchanged_loaded = True
+
+
+def _save_unchanged_signature(db_path, signature, before):
+    _unchanged_signatures[db_path] = (signature, before)
+    try:
+        conn = _metadata_cache_connection()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO unchanged_signatures VALUES (?, ?, ?, ?, ?)",
+                    (db_path, *signature, *before),
+                )
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        # The caches of the file are only kept until the server restarts
+        pass
+
+
+@contextmanager
+def writing_databases(db_paths):
+    """
+    Write databases: close the pooled connections to them, wait for the index
+    advice running on them and keep further advice off them until the block ends.
+    """
+    paths = [normalize_path(path) for path in db_paths]
+    with _index_lock:
+        for path in paths:
+            _writing[path] = _writing.get(path, 0) + 1
+        _index_lock.wait_for(lambda: _advising.isdisjoint(paths))
+    close_pooled_connections(db_paths)
+    try:
+        yield
+    finally:
+        with _index_lock:
+            for path in paths:
+                _writing[path] -= 1
+                if not _writing[path]:
+                    del _writing[path]
+
+
+def _advise_and_record(db_path):
+    with _index_lock:
+        if db_path in _writing:
+            # Advised again when the written database is next discovered
+            return None
+        _advising.add(db_path)
+    try:
+        before = _file_signature(db_path)
+        report = advise_indexes(db_path)
+    finally:
+        with _index_lock:
+            _advising.discard(db_path)
+            _index_lock.notify_all()
+    if report["analyzed"] and report["error"] is None and os.path.exists(db_path):
+        stat = os.stat(db_path)
+        # Keep the caches of the file, indexes and statistics do not change results
+        _save_unchanged_signature(db_path, (stat.st_mtime_ns, stat.st_size), before)
+    with _index_lock:
+        index_reports[db_path] = {
+            **report,
+            "signature": _file_signature(db_path) if os.path.exists(db_path) else None,
+        }
+    return report
+
+
+def schedule_index_advice(db_path, wait=False):
+    """
+    Advise indexes for a database in the background once it is idle, unless it was
+    already done for the current version of the file. With wait=True the advice
+    runs immediately.
+    """
+    if not Config.AUTO_INDEX or not os.path.exists(db_path):
+        return None
+
+    db_path = os.path.normcase(os.path.abspath(db_path))
+    with _index_lock:
+        report = index_reports.get(db_path)
+        if report and report["signature"] == _file_signature(db_path):
+            return None
+
+    if wait:
+        return _advise_and_record(db_path)
+    return _index_executor.submit(_advise_when_idle, db_path)
+
+
+def _advise_when_idle(db_path):
+    """Advise indexes once no request has read the database for a while."""
+    while True:
+        idle = time.monotonic() - _last_read.get(db_path, 0)
+        if idle >= Config.INDEX_IDLE_SECONDS:
+            break
+        # The index writes would block the requests reading the file
+        time.sleep(Config.INDEX_IDLE_SECONDS - idle)
+    return _advise_and_record(db_path)
+
+
+def get_index_reports():
+    """Return the index advice made so far, keyed by database path."""
+    with _index_lock:
+        return {
+            path: {key: value for key, value in report.items() if key != "signature"}
+            for path, report in index_reports.items()
+        }
+
+
+def _metadata_cache_connection():
+    """Open the sidecar database persisting table metadata across restarts."""
+    os.makedirs(Config.CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(Config.CACHE_DIR, "metadata.db3"), timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS table_metadata (db_path TEXT, table_name TEXT, "
+        "mtime_ns INTEGER, size INTEGER, metadata TEXT, PRIMARY KEY (db_path, table_name))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS unchanged_signatures (db_path TEXT PRIMARY KEY, "
+        "mtime_ns INTEGER, size INTEGER, before_mtime_ns INTEGER, before_size INTEGER)"
+    )
+    return conn
+
+
+def load_table_metadata(db_path, table_name):
+    """
+    Return the cached metadata of a table, or None if it was not computed for the
+    current mtime and size of the database file.
+    """
+    key = (os.path.normcase(os.path.abspath(db_path)), table_name)
+    signature = _file_signature(db_path)
+
+    with _metadata_lock:
+        entry = _metadata_memory.get(key)
+    if entry and entry[0] == signature:
+        return entry[1]
+
+    conn = _metadata_cache_connection()
+    try:
+        row = conn.execute(
+            "SELECT metadata FROM table_metadata WHERE db_path = ? AND table_name = ? "
+            "AND mtime_ns = ? AND size = ?",
+            (*key, *signature),
+        ).fetchone()
+    finally:
+        conn.close()
+
+    if row is None:
+        return None
+    metadata = json.loads(row[0])
+    with _metadata_lock:
+        _metadata_memory[key] = (signature, metadata)
+    return metadata
+
+
+def save_table_metadata(db_path, table_name, metadata):
+    """Cache the metadata of a table for the current version of the database file."""
+    key = (os.path.normcase(os.path.abspath(db_path)), table_name)
+    signature = _file_signature(db_path)
+
+    with _metadata_lock:
+        _metadata_memory[key] = (signature, metadata)
+
+    conn = _metadata_cache_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO table_metadata VALUES (?, ?, ?, ?, ?)",
+                (*key, *signature, json.dumps(metadata)),
+            )
+    finally:
+        conn.close()
@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from database import normalize_path, file_fingerprint
+
+# Files read together with a shapefile, which change its features or attributes
+SHAPEFILE_SIDECARS = [".shx", ".dbf", ".prj", ".cpg"]
+
+# Outputs built concurrently share one of these locks, by their key
+BUILD_LOCK_STRIPES = 64
+
+
+def source_files(source_path):
+    """Return the files whose content makes up a geospatial source."""
+    if source_path.lower().endswith(".shp"):
+        base = os.path.splitext(source_path)[0]
+        return [source_path] + [base + ext for ext in SHAPEFILE_SIDECARS]
+    return [source_path]
+
+
+class GeoCache:
+    """
+    Persistent cache of geospatial conversion outputs (GeoJSON, reprojected
+    rasters, rendered images) that survives restarts.
+
+    Outputs are content addressed: the file name is a hash of the source path,
+    layer, mtime and size of the source files and the conversion parameters, so a
+    changed source never matches an old output. A manifest database records the
+    outputs with their metadata (bounds, CRS, properties...), which lets a cache
+    hit skip opening the source. The total size of the outputs is bounded by
+    max_bytes and their number by max_entries, evicting the least recently used
+    ones, and the outputs of older versions of a source are deleted when it is
+    converted again. Manifest rows are deleted only once their file is removed,
+    an output in use stays listed and is removed by a later eviction. The number
+    and total size of the outputs are kept in a counters table. Functions added to
+    eviction_listeners are called with the source paths of evicted outputs.
+    """
+
+    def __init__(self, cache_dir, max_bytes, max_entries=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.eviction_listeners = []
+        self._local = threading.local()
+        # A fixed set of locks, so there is no lock per output to clean up
+        self._build_locks = [threading.Lock() for _ in range(BUILD_LOCK_STRIPES)]
+
+    def _connection(self):
+        """Return the manifest connection of the current thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(
+            os.path.join(self.cache_dir, "manifest.db3"),
+            timeout=30,
+            isolation_level=None,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outputs (key TEXT PRIMARY KEY, path TEXT, "
+            "source TEXT, layer TEXT, params TEXT, size INTEGER, meta TEXT, "
+            "created REAL, accessed REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outputs_accessed ON outputs (accessed)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outputs_source ON outputs (source)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        # Manifests of older versions have no counters yet
+        conn.execute(
+            "INSERT OR IGNORE INTO counters SELECT 'entries', COUNT(*) FROM outputs"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO counters "
+            "SELECT 'bytes', COALESCE(SUM(size), 0) FROM outputs"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, source_path, layer, params):
+        identity = json.dumps(
+            [
+                normalize_path(source_path),
+                layer,
+                file_fingerprint(source_files(source_path)),
+                params,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _build_lock(self, key):
+        return self._build_locks[int(key[:8], 16) % len(self._build_locks)]
+
+    def lookup(self, source_path, layer, params, suffix):
+        """Return (output path, metadata) of a cached output, or None."""
+        key = self._key(source_path, layer, params)
+        path = os.path.join(self.cache_dir, key + suffix)
+        conn = self._connection()
+        row = conn.execute("SELECT meta FROM outputs WHERE key = ?", (key,)).fetchone()
+        if row is None or not os.path.exists(path):
+            return None
+        conn.execute(
+            "UPDATE outputs SET accessed = ? WHERE key = ?", (time.time(), key)
+        )
+        return path, json.loads(row[0])
+
+    def get_or_create(self, source_path, layer, params, suffix, create):
+        """
+        Return (output path, metadata) for the conversion of a source layer with
+        the given parameters. On a miss create(output_path) writes the output and
+        returns its metadata dictionary, or None if the source cannot be converted,
+        in which case None is returned.
+        """
+        cached = self.lookup(source_path, layer, params, suffix)
+        if cached is not None:
+            return cached
+
+        key = self._key(source_path, layer, params)
+        with self._build_lock(key):
+            # Another thread may have built it while this one was waiting
+            cached = self.lookup(source_path, layer, params, suffix)
+            if cached is not None:
+                return cached
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, key + suffix)
+            # Keep the suffix last, drivers pick the output format from it
+            temp_path = os.path.join(
+                self.cache_dir,
+                f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}",
+            )
+            try:
+                meta = create(temp_path)
+                if meta is None or not os.path.exists(temp_path):
+                    return None
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+            now = time.time()
+            source = normalize_path(source_path)
+            params_json = json.dumps(params, sort_keys=True, default=str)
+            size = os.path.getsize(path)
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute(
+                    "SELECT size FROM outputs WHERE key = ?", (key,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        path,
+                        source,
+                        layer,
+                        params_json,
+                        size,
+                        json.dumps(meta),
+                        now,
+                        now,
+                    ),
+                )
+                if old is None:
+                    self._count(conn, size, 1)
+                else:
+                    self._count(conn, size - old[0], 0)
+                # The same conversion of an older version of the source is never
+                # read again
+                superseded = conn.execute(
+                    "SELECT key, path, source FROM outputs WHERE source = ? "
+                    "AND layer IS ? AND params = ? AND key != ?",
+                    (source, layer, params_json, key),
+                ).fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._delete_outputs(superseded)
+            self._evict(keep=key)
+            return path, meta
+
+    def _count(self, conn, size, entries):
+        conn.executemany(
+            "UPDATE counters SET value = value + ? WHERE name = ?",
+            [(size, "bytes"), (entries, "entries")],
+        )
+
+    def _counters(self, conn):
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        return counters.get("entries", 0), counters.get("bytes", 0)
+
+    def _remove_file(self, path):
+        """Remove an output file, returns False if it exists but cannot be removed."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Windows cannot remove a file that is open, e.g. while it is served
+            return False
+        return True
+
+    def _delete_outputs(self, rows):
+        """
+        Remove the files of the (key, path, source) rows, then the manifest rows of
+        the removed files. Returns the rows deleted.
+        """
+        removed = [row for row in rows if self._remove_file(row[1])]
+        if not removed:
+            return []
+        conn = self._connection()
+        deleted = []
+        size = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in removed:
+                # Another process may have deleted the row already
+                deleted_row = conn.execute(
+                    "DELETE FROM outputs WHERE key = ? RETURNING size", (row[0],)
+                ).fetchone()
+                if deleted_row is not None:
+                    deleted.append(row)
+                    size += deleted_row[0]
+            self._count(conn, -size, -len(deleted))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted
+
+    def _evict(self, keep=None):
+        """
+        Delete the least recently used outputs while the total size is above
+        max_bytes or their number above max_entries.
+        """
+        conn = self._connection()
+        entries, total = self._counters(conn)
+
+        def over_limits():
+            return total > self.max_bytes or (
+                self.max_entries is not None and entries > self.max_entries
+            )
+
+        if not over_limits():
+            return
+
+        candidates = []
+        for key, path, source, size in conn.execute(
+            "SELECT key, path, source, size FROM outputs ORDER BY accessed"
+        ).fetchall():
+            if not over_limits():
+                break
+            if key == keep:
+                continue
+            candidates.append((key, path, source))
+            total -= size
+            entries -= 1
+
+        evicted = self._delete_outputs(candidates)
+        if evicted:
+            for listener in self.eviction_listeners:
+                listener(sorted({source for _, _, source in evicted}))
+
+    def resolve(self, filename):
+        """Return the path of a cached output from its file name, or None."""
+        path = os.path.join(self.cache_dir, os.path.basename(filename))
+        return path if os.path.exists(path) else None
+
+    def stats(self):
+        entries, size = self._counters(self._connection())
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
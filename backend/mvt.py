@@ -0,0 +1,199 @@
+import math
+import struct
+import numpy as np
+import shapely
+
+# Mapbox Vector Tile 2.1 geometry types and commands
+POINT = 1
+LINESTRING = 2
+POLYGON = 3
+
+MOVE_TO = 1
+LINE_TO = 2
+CLOSE_PATH = 7
+
+
+def _varint(value):
+    """Encode an unsigned integer as a protobuf varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _length_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    """Encode a property value as a tile Value message, or None if it is empty."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _key(6, 0) + _varint(_zigzag(value) & 0xFFFFFFFFFFFFFFFF)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return _key(3, 1) + struct.pack("<d", value)
+    return _length_delimited(1, str(value).encode())
+
+
+def _ring_area(coords):
+    """Signed area of a ring in tile coordinates, positive for exterior rings."""
+    x, y = coords[:, 0], coords[:, 1]
+    return float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)) / 2
+
+
+class _GeometryEncoder:
+    """Encode geometries as tile commands, keeping the cursor between parts."""
+
+    def __init__(self):
+        self.commands = []
+        self.cursor = (0, 0)
+
+    def _points(self, coords):
+        params = []
+        x0, y0 = self.cursor
+        for x, y in coords:
+            params.append(_zigzag(int(x - x0)))
+            params.append(_zigzag(int(y - y0)))
+            x0, y0 = x, y
+        self.cursor = (x0, y0)
+        return params
+
+    def add_points(self, coords):
+        self.commands.append(MOVE_TO | (len(coords) << 3))
+        self.commands.extend(self._points(coords))
+
+    def add_line(self, coords):
+        self.commands.append(MOVE_TO | (1 << 3))
+        self.commands.extend(self._points(coords[:1]))
+        self.commands.append(LINE_TO | ((len(coords) - 1) << 3))
+        self.commands.extend(self._points(coords[1:]))
+
+    def add_ring(self, coords):
+        # The closing point is implied by ClosePath
+        self.add_line(coords[:-1])
+        self.commands.append(CLOSE_PATH | (1 << 3))
+
+
+def _tile_coordinates(geometry):
+    """Round coordinates to the tile grid, dropping repeated points."""
+    coords = np.rint(shapely.get_coordinates(geometry)).astype(np.int64)
+    if len(coords) > 1:
+        keep = np.ones(len(coords), dtype=bool)
+        keep[1:] = np.any(coords[1:] != coords[:-1], axis=1)
+        coords = coords[keep]
+    return coords
+
+
+def _parts(geometry):
+    """Yield the single part geometries of a (multi part or collection) geometry."""
+    if geometry is None or geometry.is_empty:
+        return
+    if hasattr(geometry, "geoms"):
+        for part in geometry.geoms:
+            yield from _parts(part)
+    else:
+        yield geometry
+
+
+def encode_geometry(geometry):
+    """
+    Encode a geometry in tile coordinates as (geometry type, commands) pairs, one
+    per geometry type it contains. Parts that collapse on the tile grid are dropped.
+    """
+    encoders = {}
+    points = []
+    for part in _parts(geometry):
+        if part.geom_type == "Point":
+            points.append(_tile_coordinates(part))
+        elif part.geom_type == "LineString":
+            coords = _tile_coordinates(part)
+            if len(coords) >= 2:
+                encoders.setdefault(LINESTRING, _GeometryEncoder()).add_line(coords)
+        elif part.geom_type == "Polygon":
+            exterior = _tile_coordinates(part.exterior)
+            area = _ring_area(exterior) if len(exterior) >= 4 else 0
+            if area == 0:
+                continue
+            encoder = encoders.setdefault(POLYGON, _GeometryEncoder())
+            # Exterior rings have a positive area, interior rings a negative one
+            encoder.add_ring(exterior if area > 0 else exterior[::-1])
+            for interior in part.interiors:
+                ring = _tile_coordinates(interior)
+                area = _ring_area(ring) if len(ring) >= 4 else 0
+                if area != 0:
+                    encoder.add_ring(ring[::-1] if area > 0 else ring)
+    if points:
+        # All the points of a feature are moved to by a single command
+        encoders[POINT] = _GeometryEncoder()
+        encoders[POINT].add_points(np.concatenate(points))
+    return [
+        (geometry_type, encoder.commands)
+        for geometry_type, encoder in encoders.items()
+        if encoder.commands
+    ]
+
+
+def encode_layer(name, geometries, properties, extent=4096):
+    """
+    Encode a tile layer from geometries in tile coordinates (0..extent, y down)
+    and the matching property dictionaries.
+    """
+    keys = {}
+    values = {}
+    features = []
+    for geometry, feature_properties in zip(geometries, properties):
+        encoded = encode_geometry(geometry)
+        if not encoded:
+            continue
+
+        tags = []
+        for key, value in feature_properties.items():
+            encoded_value = _encode_value(value)
+            if encoded_value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(encoded_value, len(values)))
+
+        for geometry_type, commands in encoded:
+            feature = b""
+            if tags:
+                feature += _packed(2, tags)
+            feature += _key(3, 0) + _varint(geometry_type)
+            feature += _packed(4, commands)
+            features.append(_length_delimited(2, feature))
+
+    if not features:
+        return b""
+
+    layer = _key(15, 0) + _varint(2) + _length_delimited(1, name.encode())
+    layer += b"".join(features)
+    layer += b"".join(_length_delimited(3, key.encode()) for key in keys)
+    layer += b"".join(_length_delimited(4, value) for value in values)
+    layer += _key(5, 0) + _varint(extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Encode a vector tile from encoded layers. Empty layers are left out."""
+    return b"".join(_length_delimited(3, layer) for layer in layers if layer)
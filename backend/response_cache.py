@@ -0,0 +1,346 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from flask_caching.backends.base import BaseCache
+from database import normalize_path
+
+# Hits only refresh the access time of entries last read longer ago than this, so
+# most lookups are pure reads
+ACCESS_RESOLUTION = 60
+
+# Hit and miss counts are kept per process and added to the shared counters at
+# most this often
+COUNTER_FLUSH_SECONDS = 10
+
+
+class SharedLRUCache(BaseCache):
+    """
+    Flask-Caching backend shared by the worker processes of one host.
+
+    Entries are kept in a SQLite database in cache_dir, so every process reads the
+    same entries and the values live outside the Python heap. The total size of the
+    pickled values is bounded by max_bytes, evicting the least recently used entries.
+    Values larger than spill_bytes are written to separate files in cache_dir
+    instead of the database (None keeps every value in the database).
+    Hit, miss and eviction counters are shared as well, see stats(), and the total
+    size of the entries is kept with them, so storing a value never sums the sizes.
+    Keys can be tagged with the data files they depend on, so changing a file
+    deletes only the entries computed from it, see tag() and delete_tagged().
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        max_bytes,
+        spill_bytes=None,
+        default_timeout=300,
+        ignore_delete_many_errors=False,
+    ):
+        super().__init__(
+            default_timeout=default_timeout,
+            ignore_delete_many_errors=ignore_delete_many_errors,
+        )
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.db_path = os.path.join(cache_dir, "index.db3")
+        self._local = threading.local()
+        self._counts = {}
+        self._counts_lock = threading.Lock()
+        self._counts_flushed = time.time()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(
+            config["CACHE_DIR"],
+            config["CACHE_MAX_BYTES"],
+            config.get("CACHE_SPILL_BYTES"),
+            *args,
+            **kwargs,
+        )
+
+    def _connection(self):
+        """Return the connection of the current thread, reopened after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, "
+            "path TEXT, size INTEGER, expires REAL, accessed REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tags (tag TEXT, key TEXT, PRIMARY KEY (tag, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tags_key ON tags (key)")
+        # Databases of older versions have no total size yet
+        conn.execute(
+            "INSERT OR IGNORE INTO counters "
+            "SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def _count_later(self, conn, name):
+        """Count in this process, adding the counts to the shared ones now and then."""
+        with self._counts_lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if time.time() - self._counts_flushed < COUNTER_FLUSH_SECONDS:
+                return
+        self._flush_counts(conn)
+
+    def _flush_counts(self, conn):
+        with self._counts_lock:
+            counts, self._counts = self._counts, {}
+            self._counts_flushed = time.time()
+        for name, amount in counts.items():
+            self._count(conn, name, amount)
+
+    def _remove_files(self, paths):
+        for path in paths:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _spill_path(self, key):
+        return os.path.join(
+            self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".bin"
+        )
+
+    def _expires(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        # A timeout of 0 means the entry never expires
+        return time.time() + timeout if timeout > 0 else 0
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, path, expires, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+
+        data = None
+        if row is not None:
+            value, path, expires, accessed = row
+            if expires and expires < time.time():
+                self.delete(key)
+            elif path:
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    # The spilled file was removed by another process
+                    self.delete(key)
+            else:
+                data = value
+
+        if data is None:
+            self._count_later(conn, "misses")
+            return None
+
+        now = time.time()
+        if accessed < now - ACCESS_RESOLUTION:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count_later(conn, "hits")
+        try:
+            return pickle.loads(data)
+        except (pickle.PickleError, EOFError):
+            return None
+
+    def set(self, key, value, timeout=None):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        size = len(data)
+        if size > self.max_bytes:
+            # Never let one response evict the whole cache
+            return False
+
+        path = None
+        if self.spill_bytes is not None and size > self.spill_bytes:
+            path = self._spill_path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old = conn.execute(
+                "SELECT path, size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    None if path else data,
+                    path,
+                    size,
+                    self._expires(timeout),
+                    time.time(),
+                ),
+            )
+            pending = getattr(self._local, "pending_tags", None)
+            pending_key, tags = pending or (None, [])
+            if pending_key == key:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tags VALUES (?, ?)",
+                    [(tag, key) for tag in tags],
+                )
+                self._local.pending_tags = None
+            self._count(conn, "bytes", size - (old[1] if old else 0))
+            self._flush_counts(conn)
+            evicted = self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if old and old[0] and old[0] != path:
+            evicted.append(old[0])
+        self._remove_files(evicted)
+        return True
+
+    def _total_size(self, conn):
+        row = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()
+        return row[0] if row else 0
+
+    def _evict(self, conn):
+        """
+        Above max_bytes, delete the expired entries, then the least recently used
+        ones until the entries fit. Returns the spilled files to remove.
+        """
+        size = self._total_size(conn)
+        if size <= self.max_bytes:
+            return []
+
+        expired = conn.execute(
+            "DELETE FROM entries WHERE expires > 0 AND expires < ? "
+            "RETURNING key, path, size",
+            (time.time(),),
+        ).fetchall()
+        evicted_keys = []
+        paths = [path for _, path, _ in expired]
+        total = size - sum(expired_size for _, _, expired_size in expired)
+        if total > self.max_bytes:
+            for key, path, entry_size in conn.execute(
+                "SELECT key, path, size FROM entries ORDER BY accessed"
+            ):
+                if total <= self.max_bytes:
+                    break
+                evicted_keys.append(key)
+                paths.append(path)
+                total -= entry_size
+
+        deleted_keys = [(key,) for key, _, _ in expired] + [(k,) for k in evicted_keys]
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted_keys])
+        conn.executemany("DELETE FROM tags WHERE key = ?", deleted_keys)
+        self._count(conn, "evictions", len(evicted_keys))
+        self._count(conn, "bytes", total - size)
+        return paths
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "DELETE FROM entries WHERE key = ? RETURNING path, size", (key,)
+            ).fetchone()
+            conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+            if row is not None:
+                self._count(conn, "bytes", -row[1])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return False
+        self._remove_files([row[0]])
+        return True
+
+    def has(self, key):
+        row = (
+            self._connection()
+            .execute("SELECT expires FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row is not None and not (row[0] and row[0] < time.time())
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            paths = [
+                row[0]
+                for row in conn.execute("DELETE FROM entries RETURNING path").fetchall()
+            ]
+            conn.execute("DELETE FROM tags")
+            conn.execute("UPDATE counters SET value = 0 WHERE name = 'bytes'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._remove_files(paths)
+        return True
+
+    def tag(self, key, tags):
+        """
+        Set the tags (data file paths) the entry stored under key depends on. They
+        are recorded when the current thread sets the entry, so lookups, and
+        responses that are not cached, write nothing.
+        """
+        self._local.pending_tags = (key, [normalize_path(tag) for tag in tags])
+
+    def delete_tagged(self, tags):
+        """Delete the entries depending on any of the tags. Returns the number deleted."""
+        conn = self._connection()
+        placeholders = ",".join(["?"] * len(tags))
+        keys = [
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT key FROM tags WHERE tag IN ({placeholders})",
+                [normalize_path(tag) for tag in tags],
+            ).fetchall()
+        ]
+        return sum(self.delete(key) for key in keys)
+
+    def stats(self):
+        """Return the shared counters and the current number and size of entries."""
+        conn = self._connection()
+        self._flush_counts(conn)
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "bytes": counters.get("bytes", 0),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+
+def result_size(result):
+    """Estimate the memory used by the DataFrames of a query result."""
+    return sum(
+        int(value.memory_usage(index=True, deep=True).sum())
+        for value in result.values()
+        if isinstance(value, pd.DataFrame)
+    )
+
+
+class QueryResultStore:
+    """
+    In-memory LRU store of query results shared by the threads of the process,
+    bounded by the total memory used by their DataFrames.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        size = result_size(result)
+        if size > self.max_bytes:
+            # A result larger than the store would evict everything else
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
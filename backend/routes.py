@@ -1,8 +1,9 @@
-from flask import jsonify, request, send_file
+from flask import Response, jsonify, request, send_file, stream_with_context
 import mimetypes
 from werkzeug.utils import safe_join
 import os
 import sys
+import json
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
@@ -16,8 +17,11 @@ from dotenv import load_dotenv
 import secrets
 import bcrypt
 from config import Config
+import services
 from services import (
     fetch_data_service,
+    stream_data_service,
+    dataframe_to_records,
     get_files_and_folders,
     get_table_names,
     export_data_service,
@@ -27,7 +31,14 @@ from services import (
     fetch_geojson_colors,
     convert_excels_to_db_service,
     convert_to_gpkg_service,
+    query_results,
+    geo_cache,
+    render_raster_tile,
+    render_vector_tile,
 )
+from database import get_index_reports, writing_databases
+from warmup import get_warmup_status
+from cache_keys import response_cache_key
 from utils import shutdown_server, clear_cache
 from validate import (
     validate_get_data_args,
@@ -36,11 +47,13 @@ from validate import (
     validate_list_files_args,
     validate_get_table_details_args,
     validate_geospatial_args,
+    validate_geospatial_layer_args,
     validate_export_map_args,
     validate_serve_tif_args,
+    validate_raster_tile_args,
+    validate_vector_tile_args,
     validate_convert_excels_to_db_args,
 )
-import json
 
 # Load environment variables
 load_dotenv()
@@ -78,10 +91,15 @@ PERMISSION_REQUIRED = {
     "list_files": "read",
     "get_table_details": "read",
     "geospatial": "read",
+    "geospatial_layer": "read",
     "get_geojson_colors": "read",
+    "index_report": "read",
+    "cache_stats": "read",
     "export_data": "download",
     "export_map": "download",
     "serve_tif": "download",
+    "raster_tile": "read",
+    "vector_tile": "read",
     "upload_folder": "upload",
     "convert_excels_to_db": "write",
     "convert_to_gpkg": "write",
@@ -126,6 +144,73 @@ def register_routes(app, cache):
 
         return decorator
 
+    def is_cacheable_response(response):
+        """
+        Streamed responses are consumed while sent, so they cannot be cached.
+        Entries live until their data changes, so error responses are not cached either.
+        """
+        if getattr(response, "is_streamed", False) or response.status_code != 200:
+            return False
+        # Error payloads are small, larger responses do not need to be parsed
+        if len(response.get_data()) > 4096:
+            return True
+        payload = response.get_json(silent=True)
+        return not (isinstance(payload, dict) and "error" in payload)
+
+    def versioned_cache_key():
+        """
+        Build the cache key of the current request. Stored entries are tagged with
+        the files it reads so uploads can delete the stale entries right away.
+        """
+        key, files = response_cache_key(
+            request.path, request.args, services.bmp_db_path_global
+        )
+        cache.cache.tag(key, files)
+        return key
+
+    def invalidate_data_files(paths):
+        """Delete the cached responses computed from the given files."""
+        paths = [path for path in paths if path]
+        # Shapefile layers are cached under the .shp path but read their sidecar files
+        paths += [os.path.splitext(path)[0] + ".shp" for path in paths]
+        return cache.cache.delete_tagged(paths) if paths else 0
+
+    # Cached geospatial responses link to the converted files, drop them with the files
+    geo_cache.eviction_listeners.append(invalidate_data_files)
+
+    def stream_data_response(stream, response_format):
+        """
+        Stream DataFrame chunks as NDJSON (one record per line) or as the same
+        JSON document returned by fetch_data_service, written chunk by chunk.
+        """
+
+        def generate_ndjson():
+            for chunk in stream["chunks"]:
+                yield "".join(
+                    app.json.dumps(record) + "\n"
+                    for record in dataframe_to_records(chunk)
+                )
+
+        def generate_json():
+            yield '{"data":['
+            separator = ""
+            for chunk in stream["chunks"]:
+                records = dataframe_to_records(chunk)
+                if records:
+                    yield separator + ",".join(app.json.dumps(r) for r in records)
+                    separator = ","
+            yield '],"new_feature":"","stats":[],"statsColumns":[],"timings":'
+            yield app.json.dumps(stream["timings"]) + "}"
+
+        if response_format == "ndjson":
+            return Response(
+                stream_with_context(generate_ndjson()),
+                mimetype="application/x-ndjson",
+            )
+        return Response(
+            stream_with_context(generate_json()), mimetype="application/json"
+        )
+
     @app.route("/api/login", methods=["POST"])
     def login():
         """
@@ -248,6 +333,7 @@ def register_routes(app, cache):
                 )
 
         # Loop through each file and save it in the corresponding folder
+        saved_paths = []
         for file in files:
             file_path = safe_join(Config.PATHFILE, file.filename)
 
@@ -261,7 +347,14 @@ def register_routes(app, cache):
             # Get the folder name from the file's filename
             folder_name = os.path.dirname(file_path)
             os.makedirs(folder_name, exist_ok=True)
-            file.save(file_path)
+            # Readers must not keep a replaced database open (or mapped), and
+            # the index advice must not write to it meanwhile
+            with writing_databases([file_path]):
+                file.save(file_path)
+            saved_paths.append(file_path)
+
+        # Drop only the cached responses computed from the replaced files
+        invalidate_data_files(saved_paths)
 
         return (
             jsonify({"message": "Files uploaded successfully"}),
@@ -271,7 +364,11 @@ def register_routes(app, cache):
     @app.route("/api/get_data", methods=["GET"])
     @jwt_required()
     @require_permission("read")
-    @cache.cached(timeout=300, query_string=True)
+    @cache.cached(
+        timeout=0,
+        make_cache_key=versioned_cache_key,
+        response_filter=is_cacheable_response,
+    )
     def get_data():
         data = request.args
 
@@ -280,8 +377,21 @@ def register_routes(app, cache):
         if validation_response.get("error", None):
             return jsonify(validation_response)
 
+        # Large plain non-aggregated queries are streamed chunk by chunk
+        stream = stream_data_service(data)
+        if stream is not None:
+            if stream.get("error", None):
+                return jsonify(stream)
+            return stream_data_response(stream, data.get("format", "records"))
+
         response = fetch_data_service(data)
 
+        # Arrow IPC responses are sent as binary
+        if response.get("arrow", None) is not None:
+            return Response(
+                response["arrow"], mimetype="application/vnd.apache.arrow.stream"
+            )
+
         return jsonify(response)
 
     @app.route("/api/export_data", methods=["GET", "POST"])
@@ -322,7 +432,11 @@ def register_routes(app, cache):
     @app.route("/api/get_tables", methods=["GET"])
     @jwt_required()
     @require_permission("read")
-    @cache.cached(timeout=300, query_string=True)
+    @cache.cached(
+        timeout=0,
+        make_cache_key=versioned_cache_key,
+        response_filter=is_cacheable_response,
+    )
     def get_tables():
         data = request.args
 
@@ -358,8 +472,10 @@ def register_routes(app, cache):
     @jwt_required()
     @require_permission("read")
     @cache.cached(
-        timeout=300, query_string=True
-    )  # Cache this endpoint for 2 minutes (120 seconds)
+        timeout=0,
+        make_cache_key=versioned_cache_key,
+        response_filter=is_cacheable_response,
+    )
     def get_table_details():
         """
         Endpoint to get table column names, time start, time end, and ID list, date type, and default interval.
@@ -378,7 +494,11 @@ def register_routes(app, cache):
     @app.route("/api/geospatial", methods=["GET"])
     @jwt_required()
     @require_permission("read")
-    @cache.cached(timeout=300, query_string=True)
+    @cache.cached(
+        timeout=0,
+        make_cache_key=versioned_cache_key,
+        response_filter=is_cacheable_response,
+    )
     def geospatial():
         """
         API endpoint to return GeoJSON/Tiff Image Url, bounds, and center.
@@ -394,6 +514,25 @@ def register_routes(app, cache):
 
         return jsonify(geo_data)
 
+    @app.route("/api/geospatial/layers/<path:filename>", methods=["GET"])
+    @jwt_required()
+    @require_permission("read")
+    def geospatial_layer(filename):
+        """
+        Serve a vector layer converted to FlatGeobuf by /api/geospatial?format=fgb.
+        The file is streamed from the geospatial cache, its name changes with the source.
+        """
+        validation_response = validate_geospatial_layer_args(filename)
+        if validation_response.get("error", None):
+            return jsonify(validation_response)
+
+        layer_path = geo_cache.resolve(filename)
+        if layer_path is None:
+            return jsonify({"error": "Geospatial layer not found."})
+        return send_file(
+            layer_path, mimetype="application/flatgeobuf", conditional=True
+        )
+
     @app.route("/api/geotiff/<path:filename>", methods=["GET"])
     @jwt_required()
     @require_permission("download")
@@ -405,8 +544,8 @@ def register_routes(app, cache):
         if not (filename.lower().endswith((".tif", ".tiff", ".png"))):
             return jsonify({"error": "Only .tif or .tiff files are allowed"})
 
-        # Ensure the file is in the TEMP directory
-        filename = safe_join(Config.TEMPDIR, filename)
+        # Rendered images are served from the geospatial cache, other files from TEMP
+        filename = geo_cache.resolve(filename) or safe_join(Config.TEMPDIR, filename)
 
         # Validate the file path
         validation_response = validate_serve_tif_args(filename)
@@ -415,10 +554,68 @@ def register_routes(app, cache):
 
         return send_file(filename, mimetype="image/png", as_attachment=True)
 
+    @app.route(
+        "/api/tiles/raster/<path:layer>/<int:z>/<int:x>/<int:y>.png", methods=["GET"]
+    )
+    @jwt_required()
+    @require_permission("read")
+    def raster_tile(layer, z, x, y):
+        """
+        Serve one XYZ tile of a raster layer, rendered from its overviews.
+        """
+        validation_response = validate_raster_tile_args(layer, z, x, y)
+        if validation_response.get("error", None):
+            return jsonify(validation_response)
+
+        tile = render_raster_tile(layer, z, x, y)
+        if tile.get("error", None):
+            return jsonify(tile)
+        if tile.get("png", None) is not None:
+            return Response(tile["png"], mimetype="image/png")
+
+        # The cached tile name changes with the source, so its ETag does too
+        return send_file(tile["file_path"], mimetype="image/png", conditional=True)
+
+    @app.route(
+        "/api/tiles/vector/<path:layer>/<int:z>/<int:x>/<int:y>.pbf", methods=["GET"]
+    )
+    @jwt_required()
+    @require_permission("read")
+    def vector_tile(layer, z, x, y):
+        """
+        Serve one XYZ Mapbox Vector Tile of a shapefile or GeoPackage layer.
+        The properties argument lists the fields shown in tooltips, ID fields
+        are always included.
+        """
+        validation_response = validate_vector_tile_args(layer, z, x, y)
+        if validation_response.get("error", None):
+            return jsonify(validation_response)
+
+        requested_fields = [
+            field.strip()
+            for field in request.args.get("properties", "").split(",")
+            if field.strip()
+        ]
+        tile = render_vector_tile(layer, z, x, y, requested_fields)
+        if tile.get("error", None):
+            return jsonify(tile)
+        if tile.get("pbf", None) is not None:
+            return Response(tile["pbf"], mimetype="application/vnd.mapbox-vector-tile")
+
+        return send_file(
+            tile["file_path"],
+            mimetype="application/vnd.mapbox-vector-tile",
+            conditional=True,
+        )
+
     @app.route("/api/get_geojson_colors", methods=["GET"])
     @jwt_required()
     @require_permission("read")
-    @cache.cached(timeout=300, query_string=True)
+    @cache.cached(
+        timeout=0,
+        make_cache_key=versioned_cache_key,
+        response_filter=is_cacheable_response,
+    )
     def get_geojson_colors():
         """
         API endpoint to get GeoJSON colors.
@@ -434,6 +631,35 @@ def register_routes(app, cache):
 
         return jsonify(colors)
 
+    @app.route("/api/ready", methods=["GET"])
+    def ready():
+        """
+        API endpoint to report the progress of the warm-up started with the server,
+        polled by the frontend before the first data and map requests.
+        """
+        return jsonify(get_warmup_status())
+
+    @app.route("/api/index_report", methods=["GET"])
+    @jwt_required()
+    @require_permission("read")
+    def index_report():
+        """
+        API endpoint to report the indexes created in the watershed databases.
+        """
+        return jsonify(get_index_reports())
+
+    @app.route("/api/cache_stats", methods=["GET"])
+    @jwt_required()
+    @require_permission("read")
+    def cache_stats():
+        """
+        API endpoint to report the hits, misses, evictions and size of the response
+        cache and of the query result store.
+        """
+        return jsonify(
+            {**cache.cache.stats(), "query_results": query_results.stats()}
+        )
+
     @app.route("/api/export_map", methods=["POST"])
     @jwt_required()
     @require_permission("download")
@@ -479,6 +705,11 @@ def register_routes(app, cache):
 
         result = convert_excels_to_db_service(excel_files, data)
 
+        if not result.get("error", None):
+            invalidate_data_files(
+                list(result.values()) + [os.path.join(Config.BASE_DIR, "Help.db3")]
+            )
+
         # Return all created database paths
         return jsonify(result)
 
@@ -496,6 +727,9 @@ def register_routes(app, cache):
 
         converted_files = convert_to_gpkg_service(uploaded_files)
 
+        if isinstance(converted_files, str):
+            invalidate_data_files([converted_files])
+
         # Return single GPKG file path
         return jsonify(converted_files)
 
@@ -16,27 +16,234 @@ from scipy.stats import skew
 from matplotlib.ticker import MaxNLocator, LinearLocator
 from cycler import cycler
 from config import Config
+from database import (
+    get_connection,
+    schedule_index_advice,
+    writing_databases,
+    load_table_metadata,
+    save_table_metadata,
+    file_fingerprint,
+)
+from result_store import QueryResultStore
+from validate import canonical_request_args
+from cache_keys import request_data_files
+from geo_cache import GeoCache
+from alias_registry import AliasRegistry
+from mvt import encode_layer, encode_tile
 from datetime import datetime
 import sys
+import io
 import json
+import time
+import threading
+import base64
 from concurrent.futures import ThreadPoolExecutor
 import pyogrio
+import shapely
 from osgeo import ogr, osr, gdal
 from zipfile import ZipFile, ZIP_DEFLATED
 from werkzeug.utils import safe_join
 import re
 import numexpr as ne
 
-alias_mapping = {}
+# Table and column aliases from the lookup database
+alias_registry = AliasRegistry()
 global_dbs_tables_columns = {}
 os.environ["PROJ_LIB"] = Config.PROJ_LIB
 os.environ["GDAL_DATA"] = Config.GDAL_DATA
 os.environ["PATH"] += os.pathsep + Config.PATH
 bmp_db_path_global = None
+# Parsed HelpMetadata of Help.db3 as (file signature, {Help_ID: attribute set})
+help_attributes_cache = None
+help_attributes_lock = threading.Lock()
+# Long-lived workers for per-table fetches, so their pooled connections are reused
+table_fetch_executor = ThreadPoolExecutor(
+    max_workers=Config.FETCH_WORKERS, thread_name_prefix="table_fetch"
+)
+# Complete query results shared by get_data, get_geojson_colors and export_data
+query_results = QueryResultStore(Config.QUERY_RESULT_MAX_BYTES)
+# Request arguments that change the result of a data query
+QUERY_ARGUMENTS = [
+    "db_tables",
+    "columns",
+    "id",
+    "id_column",
+    "start_date",
+    "end_date",
+    "date_type",
+    "interval",
+    "method",
+    "statistics",
+    "month",
+    "season",
+    "spatial_scale",
+    "field_selected_ids",
+    "math_formula",
+    "filter",
+]
+# Converted geospatial outputs, kept across restarts
+geo_cache = GeoCache(
+    Config.GEO_CACHE_DIR, Config.GEO_CACHE_MAX_BYTES, Config.GEO_CACHE_MAX_ENTRIES
+)
+# XYZ tiles: tile size in pixels and half the width of the Web Mercator world
+TILE_SIZE = 256
+WEB_MERCATOR_EXTENT = 20037508.342789244
+empty_tile_png = None
+# Vector tiles: grid size, buffer around the tile and simplification tolerance,
+# in tile units (one screen pixel is VECTOR_TILE_EXTENT / TILE_SIZE units)
+VECTOR_TILE_EXTENT = 4096
+VECTOR_TILE_BUFFER = 64
+VECTOR_TILE_TOLERANCE = VECTOR_TILE_EXTENT / TILE_SIZE / 2
+# ID fields sent with every vector tile: "ID", "Subbasin_ID", "FieldId", but not
+# names merely containing the letters such as "Width" or "Valid"
+ID_FIELD_PATTERN = re.compile(r"(?:^|_)(?:id|Id|ID)$|(?<=[a-z0-9])I[dD]$")
+# Pixels read at once when computing raster statistics and rendering images
+RASTER_WINDOW_PIXELS = 4 * 1024 * 1024
+# Longest side of the rasters drawn in exported maps (10 inches at 300 dpi)
+RASTER_PREVIEW_SIZE = 3000
+# Longest side of the raster images overlaid on the map, the XYZ tiles of
+# /api/tiles/raster serve the full resolution
+RASTER_IMAGE_SIZE = 4096
+# OGR drivers of the vector formats served by /api/geospatial
+VECTOR_FORMATS = {"geojson": "GeoJSON", "fgb": "FlatGeobuf"}
+# Simplified GeoJSON levels as (maximum map zoom, tolerance in degrees, decimals),
+# the tolerance is about half a screen pixel at the maximum zoom
+GEOJSON_LEVELS = [(8, 0.0027, 3), (11, 0.00034, 4), (14, 0.000043, 5)]
+# Season names accepted in requests mapped to the names used in aggregated data
+SEASON_NAMES = {"winter": "Winter", "spring": "Spring", "summer": "Summer", "fall": "Autumn"}
+
+
+def fetch_data_service(data, response_format=None):
+    """
+    Fetch data and statistics from the specified databases and tables.
+    response_format is "records" (default), "columnar" or "arrow"; when not given
+    it is read from the request's "format" argument.
+    With a "limit" argument only one page of rows, ordered by ID and date, is returned
+    with the total row count and the cursor of the next page; statistics still cover
+    all rows.
+    """
+    try:
+        response_format = response_format or data.get("format", "records")
+        limit = int(data["limit"]) if data.get("limit") else None
+        page_cursor = decode_cursor(data.get("cursor")) if limit else None
+
+        result = get_data_result(data, limit, page_cursor)
+        if result.get("error", None):
+            return result
+
+        df = result["df"]
+        stats_df = result["stats_df"]
+        new_feature = result["new_feature"]
+        timings = result["timings"]
+
+        page = {}
+        if limit:
+            if "next_cursor" in result:
+                # The page was already read in SQL
+                page = {"total": result["total"], "next_cursor": result["next_cursor"]}
+            else:
+                id_column = data.get("id_column", "ID")
+                date_type = data.get("date_type")
+                df, total_rows, next_cursor = page_dataframe(
+                    df,
+                    [col for col in [id_column, date_type] if col and col in df.columns],
+                    page_cursor,
+                    limit,
+                )
+                page = {"total": total_rows, "next_cursor": next_cursor}
+
+        def replace_nan_with_none(records):
+            for record in records:
+                for key, value in record.items():
+                    if (
+                        isinstance(value, float) or isinstance(value, int)
+                    ) and np.isnan(value):
+                        record[key] = None
+            return records
+
+        stats = (
+            replace_nan_with_none(stats_df.to_dict(orient="records"))
+            if stats_df is not None
+            else []
+        )
+        stats_columns = stats_df.columns.tolist() if stats_df is not None else []
+
+        if response_format == "columnar":
+            # One array per column, the column names are sent only once
+            return {
+                "format": "columnar",
+                "columns": df.columns.tolist(),
+                "data": [column_to_list(df.iloc[:, i]) for i in range(df.shape[1])],
+                "new_feature": new_feature,
+                "stats": stats,
+                "statsColumns": stats_columns,
+                "timings": timings,
+                **page,
+            }
+        elif response_format == "arrow":
+            return {
+                "arrow": dataframe_to_arrow(
+                    df,
+                    {
+                        "new_feature": new_feature,
+                        "stats": stats,
+                        "statsColumns": stats_columns,
+                        "timings": timings,
+                        **page,
+                    },
+                )
+            }
 
+        # Return the data and statistics as dictionaries
+        return {
+            "data": replace_nan_with_none(df.to_dict(orient="records")),
+            "new_feature": new_feature,
+            "stats": stats,
+            "statsColumns": stats_columns,
+            "timings": timings,
+            **page,
+        }
+    except Exception as e:
+        return {"error": str(e)}
 
-def fetch_data_service(data):
-    """Fetch data and statistics from the specified databases and tables."""
+
+def get_data_result(data, limit=None, page_cursor=None):
+    """
+    Return the result of a data query, shared by get_data, get_geojson_colors and
+    export_data: complete results are kept in the query result store, keyed by the
+    query arguments and the version of the databases they read.
+    A page read in SQL (see run_data_query) is returned as is and not stored.
+    Stored DataFrames are shared, so callers must not modify them in place.
+    """
+    key = query_result_key(data)
+    result = query_results.get(key)
+    if result is not None:
+        return result
+
+    result = run_data_query(data, limit, page_cursor)
+    if not result.get("error", None) and "next_cursor" not in result:
+        query_results.put(key, result)
+    return result
+
+
+def query_result_key(data):
+    """Build the query result store key from the arguments that change the result."""
+    files = request_data_files(data, bmp_db_path_global)
+    arguments = {name: data.get(name) for name in QUERY_ARGUMENTS if name in data}
+    return (
+        canonical_request_args(arguments),
+        file_fingerprint(files),
+    )
+
+
+def run_data_query(data, limit=None, page_cursor=None):
+    """
+    Run the data query pipeline: fetch, field scale, reach filter, formula, column
+    filters, aggregation, statistics and Help.db3 columns. Returns the rounded data
+    and statistics DataFrames, or an error dictionary.
+    When limit is given and no step needs the other rows, only the page following
+    page_cursor is read in SQL and the total row count and next cursor are added.
+    """
     try:
         # Extract the required parameters from the request data
         db_tables = json.loads(data.get("db_tables"))
@@ -58,15 +265,29 @@ def fetch_data_service(data):
         field_selected_ids = data.get("field_selected_ids", [])
         math_formula = data.get("math_formula", None)
         stats_df = None
+        total_rows = next_cursor = None
+
+        filter_dict = json.loads(data["filter"]) if "filter" in data else {}
 
         if spatial_scale == "field":
             field_selected_ids = selected_ids
             selected_ids = []
 
-        # Initialize DataFrame to store the merged data
-        df = pd.DataFrame()
+        # Sum monthly, yearly and seasonal data inside SQLite when no step needs the daily rows
+        sql_interval = (
+            interval
+            if "Equal" not in method
+            and interval != "daily"
+            and date_type in ["Time", "Date"]
+            and len(db_tables) == 1
+            and spatial_scale != "field"
+            and not math_formula
+            and not any(filter_dict.values())
+            else "daily"
+        )
 
-        # Fetch the data for each database and table, and merge it based on date_type & 'ID'
+        # Decide which columns to fetch from each database and table
+        table_plans = []
         for table in db_tables:
             try:
                 table_key = f"{(table['db'], table['table'])}"
@@ -76,35 +297,14 @@ def fetch_data_service(data):
                     if global_columns and id_column in global_columns
                     else []
                 )
-                duplicate_columns = []
-                is_all_columns = False
 
                 if not global_columns:
                     return {"error": f"No columns found for the table {table_key}"}
 
                 # Determine which columns to fetch
-                if columns == "All":
-                    # Fetch all columns for the table
-                    fetch_columns = columns
-                    is_all_columns = True
-                else:
-                    fetch_columns = set()
-                    prefix_columns = [
-                        col for col in columns if col.startswith(table["table"])
-                    ]
-
-                    # Check if the table has a prefix
-                    for col in columns:
-                        if col in prefix_columns:
-                            original_col = col[
-                                len(table["table"]) + 1 :
-                            ]  # Strip prefix
-                            if original_col in global_columns:
-                                fetch_columns.add(original_col)
-                                duplicate_columns.append(col)
-                        elif col in global_columns:
-                            # Non-prefixed columns for tables without prefixes
-                            fetch_columns.add(col)
+                fetch_columns, duplicate_columns = resolve_fetch_columns(
+                    table["table"], columns, global_columns
+                )
 
                 # Remove fetched columns from columns list
                 columns = (
@@ -117,29 +317,131 @@ def fetch_data_service(data):
                     # If there are no common columns, skip the table
                     continue
 
-                # Fetch data from the database
+                table_plans.append(
+                    {
+                        "table": table,
+                        "table_key": table_key,
+                        "fetch_columns": fetch_columns,
+                        "duplicate_columns": duplicate_columns,
+                    }
+                )
+            except Exception as e:
+                return {"error": f"Error while processing table {table_key}: {str(e)}"}
+
+        # Read only the requested page in SQL when no step needs the other rows
+        page_keys = []
+        if (
+            limit
+            and len(db_tables) == 1
+            and len(table_plans) == 1
+            and ("Equal" in method or interval == "daily")
+            and "None" in statistics
+            and not math_formula
+            and spatial_scale not in ["field", "reach"]
+            and not any(filter_dict.values())
+            and (page_cursor is None or "after" in page_cursor)
+        ):
+            global_columns = global_dbs_tables_columns.get(table_plans[0]["table_key"])
+            # Model outputs have one row per ID and date, so the pair is a unique key
+            if (
+                "Help_ID" not in global_columns
+                and id_column in global_columns
+                and date_type in global_columns
+            ):
+                page_keys = [id_column, date_type]
+        if page_keys and table_plans[0]["fetch_columns"] != "All":
+            # The key columns are needed for the next cursor and dropped when ordering
+            table_plans[0]["fetch_columns"] = table_plans[0]["fetch_columns"] | set(
+                page_keys
+            )
+
+        timings = {}
+        # Initialize DataFrame to store the merged data
+        df = pd.DataFrame()
+
+        def fetch_table(plan):
+            nonlocal total_rows, next_cursor
+            table = plan["table"]
+            start_time = time.perf_counter()
+            if page_keys:
+                # One extra row tells whether there is a next page
+                df_temp, total_rows = fetch_data_from_db(
+                    table["db"],
+                    table["table"],
+                    selected_ids,
+                    plan["fetch_columns"],
+                    start_date,
+                    end_date,
+                    date_type,
+                    limit=limit + 1,
+                    after=page_cursor["after"] if page_cursor else None,
+                    key_columns=page_keys,
+                )
+                if len(df_temp) > limit:
+                    df_temp = df_temp.iloc[:limit]
+                    next_cursor = encode_cursor(
+                        {"after": [df_temp[col].iloc[-1] for col in page_keys]}
+                    )
+                rename_prefixed_columns(
+                    df_temp, table["table"], plan["duplicate_columns"]
+                )
+                return df_temp, False, time.perf_counter() - start_time
+
+            # Fetch data from the database
+            df_temp = fetch_data_from_db(
+                table["db"],
+                table["table"],
+                selected_ids,
+                plan["fetch_columns"],
+                start_date,
+                end_date,
+                date_type,
+                interval=sql_interval,
+                month=month,
+                season=season,
+            )
+            aggregated = df_temp is not None
+
+            # Fall back to aggregating in pandas if SQLite could not do it
+            if not aggregated:
                 df_temp = fetch_data_from_db(
                     table["db"],
                     table["table"],
                     selected_ids,
-                    fetch_columns,
+                    plan["fetch_columns"],
                     start_date,
                     end_date,
                     date_type,
                 )
 
-                # Rename columns to table-column format
-                for col in duplicate_columns:
-                    col_temp = col[len(table["table"]) + 1 :]
-                    if col_temp in df_temp.columns:
-                        df_temp.rename(columns={col_temp: col}, inplace=True)
+            # Rename columns to table-column format
+            rename_prefixed_columns(df_temp, table["table"], plan["duplicate_columns"])
+            return df_temp, aggregated, time.perf_counter() - start_time
+
+        # Fetch the tables concurrently and merge them in request order based on date_type & 'ID'
+        plans = table_plans
+        futures = (
+            [table_fetch_executor.submit(fetch_table, plan) for plan in plans]
+            if len(plans) > 1
+            else []
+        )
+        for i, plan in enumerate(plans):
+            table = plan["table"]
+            table_key = plan["table_key"]
+            try:
+                df_temp, aggregated, elapsed = (
+                    futures[i].result() if futures else fetch_table(plan)
+                )
+                timings[table_key] = round(elapsed, 4)
+                if not aggregated:
+                    sql_interval = "daily"
 
                 # Merge the dataframes on date_type and 'ID' columns
                 if df.empty:
                     df = df_temp
                 else:
                     # Case of All columns, rename columns to table-column format
-                    if is_all_columns:
+                    if plan["fetch_columns"] == "All":
                         for col in df.columns:
                             if col in df_temp.columns and col not in [
                                 date_type,
@@ -172,7 +474,7 @@ def fetch_data_service(data):
         if spatial_scale == "field":
             # Connect to BMPs.db3 to fetch subarea information
             bmp_db_path = safe_join(Config.PATHFILE, bmp_db_path_global)
-            conn = sqlite3.connect(bmp_db_path)
+            conn = get_connection(bmp_db_path)
 
             try:
                 # Get the ID column name for Subarea table
@@ -251,12 +553,10 @@ def fetch_data_service(data):
                 field_values_df.rename(columns={"FieldId": ID}, inplace=True)
 
                 # Replace the original DataFrame's values with the calculated field values
-                df = round_df_except_latlon(field_values_df.copy())
+                df = field_values_df
 
             except Exception as e:
                 return {"error": f"Error processing field values: {str(e)}"}
-            finally:
-                conn.close()
         elif spatial_scale == "reach":
             # Select all IDs except 0 as Reach ID = 0 is used for watershed average
             df = df[df[ID] != 0]
@@ -292,6 +592,7 @@ def fetch_data_service(data):
                     return {"error": "Invalid characters or columns in the formula."}
 
                 # Create a mapping of alias to real column names
+                alias_mapping = alias_registry.mapping
                 real_col = {
                     col: columns_dict[col]
                     for table in db_tables
@@ -359,13 +660,8 @@ def fetch_data_service(data):
                 return {"error": f"Error evaluating formula: {str(e)}"}
 
         # Filter each df column for specific values from dict
-        if "filter" in data:
-            filter_dict = json.loads(data["filter"])
-            for col, values in filter_dict.items():
-                if col in df.columns and values:
-                    values_set = {d["value"] for d in values}
-                    # Filter the DataFrame to keep only rows where the column value is in the specified values
-                    df = df[df[col].isin(values_set)]
+        if filter_dict:
+            df = apply_column_filters(df, filter_dict)
 
         # Perform time conversion and aggregation if necessary
         if "Equal" not in method and interval != "daily":
@@ -373,9 +669,13 @@ def fetch_data_service(data):
                 return {
                     "error": "Time conversion and statistics cannot be performed for non-time series data"
                 }
-            df, stats_df = aggregate_data(
-                df, interval, method, date_type, month, season
-            )
+            if sql_interval != "daily":
+                # Already aggregated by SQLite, only the statistics are left
+                stats_df = calculate_statistics(df, method, date_type)
+            else:
+                df, stats_df = aggregate_data(
+                    df, interval, method, date_type, month, season
+                )
         elif "None" not in statistics:
             if not date_type:
                 return {
@@ -383,80 +683,334 @@ def fetch_data_service(data):
                 }
             stats_df = calculate_statistics(df, statistics, date_type)
 
-        # Check if the DataFrame contains only needed columns according to the Attributes in Help.db3
-        if os.path.exists(safe_join(Config.BASE_DIR, "Help.db3")):
-            # Connect to Help.db3 to fetch Help information
-            bmp_db_path = safe_join(Config.BASE_DIR, "Help.db3")
-            conn = sqlite3.connect(bmp_db_path)
-            query = "SELECT * FROM HelpMetadata"
-            bmp_df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            if not bmp_df.empty and "Help_ID" in df.columns:
-                unique_help_ids_df = df["Help_ID"].unique()
-                # Filter bmp_df for matching Help_IDs
-                bmp_df = bmp_df[bmp_df["Help_ID"].isin(unique_help_ids_df)]
-
-                if not bmp_df.empty and "Attributes" in bmp_df.columns:
-                    # Collect all attributes from the Attributes column
-                    attributes_set = set()
-                    for attr_str in bmp_df["Attributes"]:
-                        try:
-                            attrs = json.loads(attr_str)
-                            if isinstance(attrs, list):
-                                attributes_set.update(attrs)
-                        except (json.JSONDecodeError, TypeError):
-                            continue
-
-                    # Filter df to include only relevant columns
-                    df = df[
-                        [
-                            col
-                            for col in df.columns
-                            if col in attributes_set or col == "Help_ID"
-                        ]
+        # Keep only the columns listed in the Help.db3 Attributes of the result's Help_IDs
+        help_attributes = get_help_attributes()
+        if help_attributes and "Help_ID" in df.columns:
+            attribute_sets = [
+                help_attributes[help_id]
+                for help_id in df["Help_ID"].unique()
+                if help_id in help_attributes
+            ]
+            if attribute_sets:
+                attributes_set = frozenset().union(*attribute_sets)
+                df = df[
+                    [
+                        col
+                        for col in df.columns
+                        if col in attributes_set or col == "Help_ID"
                     ]
-
-        def replace_nan_with_none(records):
-            for record in records:
-                for key, value in record.items():
-                    if (
-                        isinstance(value, float) or isinstance(value, int)
-                    ) and np.isnan(value):
-                        record[key] = None
-            return records
+                ]
 
         # Order the columns in the DataFrame based on the original columns
         if original_columns:
             df = df[original_columns]
 
-        # Return the data and statistics as dictionaries
-        return {
-            "data": replace_nan_with_none(
-                round_df_except_latlon(df).to_dict(orient="records")
-            ),
+        df = round_df_except_latlon(df)
+        stats_df = round_df_except_latlon(stats_df) if stats_df is not None else None
+
+        result = {
+            "df": df,
+            "stats_df": stats_df,
             "new_feature": new_feature,
-            "stats": (
-                replace_nan_with_none(stats_df.to_dict(orient="records"))
-                if stats_df is not None
-                else []
-            ),
-            "statsColumns": stats_df.columns.tolist() if stats_df is not None else [],
+            "timings": timings,
         }
+        if page_keys:
+            result.update({"total": total_rows, "next_cursor": next_cursor})
+        return result
     except Exception as e:
         return {"error": str(e)}
 
 
+def stream_data_service(data):
+    """
+    Fetch the data of a plain (single table, non-aggregated, no statistics,
+    formula or field scale) NDJSON request, or JSON request of at least
+    STREAM_MIN_ROWS rows, chunk by chunk so it can be streamed.
+    Returns None when the request needs the full DataFrame or is small enough to
+    be answered (and cached) whole, an error dictionary,
+    or {"columns": ..., "chunks": iterator of processed DataFrames, "timings": ...},
+    the timings being complete once the chunks are consumed.
+    """
+    try:
+        db_tables = json.loads(data.get("db_tables"))
+        columns = (
+            json.loads(data.get("columns")) if data.get("columns") != "All" else "All"
+        )
+        interval = data.get("interval", "daily")
+        method = json.loads(data.get("method", "['Equal']"))
+        statistics = json.loads(data.get("statistics", "['None']"))
+        spatial_scale = data.get("spatial_scale", None)
+        id_column = data.get("id_column", "ID")
+
+        if (
+            data.get("format", "records") not in ["records", "ndjson"]
+            or len(db_tables) != 1
+            or spatial_scale in ["field", "unknown"]
+            or ("Equal" not in method and interval != "daily")
+            or "None" not in statistics
+            or data.get("math_formula", None)
+            or data.get("limit", None)
+        ):
+            return None
+
+        table = db_tables[0]
+        table_key = f"{(table['db'], table['table'])}"
+        global_columns = global_dbs_tables_columns.get(table_key)
+
+        # Help.db3 column filtering needs all Help_IDs of the result at once
+        if not global_columns or "Help_ID" in global_columns:
+            return None
+
+        fetch_columns, duplicate_columns = resolve_fetch_columns(
+            table["table"], columns, global_columns
+        )
+        if not fetch_columns:
+            return {"error": "No data found for the specified filters."}
+
+        fetch_arguments = (
+            table["db"],
+            table["table"],
+            json.loads(data.get("id")),
+            fetch_columns,
+            data.get("start_date"),
+            data.get("end_date"),
+            data.get("date_type"),
+        )
+        if data.get("format", "records") != "ndjson" and (
+            fetch_data_from_db(*fetch_arguments, count_only=True)
+            < Config.STREAM_MIN_ROWS
+        ):
+            return None
+
+        filter_dict = json.loads(data["filter"]) if "filter" in data else {}
+        original_columns = columns if isinstance(columns, list) else []
+
+        def process_chunk(df):
+            rename_prefixed_columns(df, table["table"], duplicate_columns)
+            if spatial_scale == "reach":
+                # Select all IDs except 0 as Reach ID = 0 is used for watershed average
+                df = df[df[id_column] != 0]
+            df = apply_column_filters(df, filter_dict)
+            if original_columns:
+                df = df[original_columns]
+            return round_df_except_latlon(df)
+
+        # Filled in while the chunks are read, sent after the last one
+        timings = {}
+
+        def read_chunks():
+            start_time = time.perf_counter()
+            elapsed = 0.0
+            reader = fetch_data_from_db(
+                *fetch_arguments, chunksize=Config.STREAM_CHUNK_SIZE
+            )
+            for chunk in reader:
+                chunk = process_chunk(chunk)
+                # Only reading and processing count, not sending the chunks
+                elapsed += time.perf_counter() - start_time
+                timings[table_key] = round(elapsed, 4)
+                yield chunk
+                start_time = time.perf_counter()
+
+        chunks = read_chunks()
+
+        # Read up to the first non-empty chunk so an empty result is still reported as an error
+        first_chunk = next((chunk for chunk in chunks if not chunk.empty), None)
+        if first_chunk is None:
+            return {"error": "No data found for the specified filters."}
+
+        return {
+            "columns": first_chunk.columns.tolist(),
+            "chunks": itertools.chain([first_chunk], chunks),
+            "timings": timings,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def dataframe_to_records(df):
+    """Convert a DataFrame to a list of row dictionaries with NaN values as None."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def encode_cursor(position):
+    """Encode a page position as an opaque URL-safe cursor token."""
+    # NumPy scalars of the key columns are converted to plain Python values
+    payload = json.dumps(position, default=lambda value: value.item())
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token):
+    """Decode a cursor token into a page position, or None for the first page."""
+    if not token:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or not ("after" in position or "offset" in position):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def page_dataframe(df, key_columns, cursor, limit):
+    """
+    Return the page of a complete result following the cursor, the total row count
+    and the next cursor (None on the last page). Pages follow the key values when
+    they are unique in the result, and the row offset otherwise.
+    """
+    total_rows = len(df)
+    if (
+        key_columns
+        and not (cursor and "offset" in cursor)
+        and not df.duplicated(key_columns).any()
+    ):
+        df = df.sort_values(key_columns, kind="stable")
+        if cursor:
+            # Keep the rows after the cursor in lexicographic key order
+            after = cursor["after"]
+            mask = pd.Series(False, index=df.index)
+            equal = pd.Series(True, index=df.index)
+            for col, value in zip(key_columns, after):
+                mask |= equal & (df[col] > value)
+                equal &= df[col] == value
+            df = df[mask]
+        page_df = df.iloc[:limit]
+        next_cursor = (
+            encode_cursor({"after": [page_df[col].iloc[-1] for col in key_columns]})
+            if len(df) > limit
+            else None
+        )
+    else:
+        if cursor and "offset" not in cursor:
+            raise ValueError("Invalid cursor")
+        offset = cursor["offset"] if cursor else 0
+        page_df = df.iloc[offset : offset + limit]
+        next_cursor = (
+            encode_cursor({"offset": offset + limit})
+            if total_rows > offset + limit
+            else None
+        )
+    return page_df, total_rows, next_cursor
+
+
+def resolve_fetch_columns(table_name, columns, global_columns):
+    """
+    Determine which real columns to fetch from a table for the requested columns.
+    Returns the columns to fetch ("All" or a set) and the requested columns that
+    are prefixed with the table name (table-column format).
+    """
+    if columns == "All":
+        # Fetch all columns for the table
+        return columns, []
+
+    fetch_columns = set()
+    duplicate_columns = []
+    prefix_columns = [col for col in columns if col.startswith(table_name)]
+
+    # Check if the table has a prefix
+    for col in columns:
+        if col in prefix_columns:
+            original_col = col[len(table_name) + 1 :]  # Strip prefix
+            if original_col in global_columns:
+                fetch_columns.add(original_col)
+                duplicate_columns.append(col)
+        elif col in global_columns:
+            # Non-prefixed columns for tables without prefixes
+            fetch_columns.add(col)
+
+    return fetch_columns, duplicate_columns
+
+
+def rename_prefixed_columns(df, table_name, duplicate_columns):
+    """Rename fetched columns in place to their table-column format."""
+    for col in duplicate_columns:
+        col_temp = col[len(table_name) + 1 :]
+        if col_temp in df.columns:
+            df.rename(columns={col_temp: col}, inplace=True)
+
+
+def apply_column_filters(df, filter_dict):
+    """Keep only the rows whose column values are in the selected filter values."""
+    for col, values in filter_dict.items():
+        if col in df.columns and values:
+            values_set = {d["value"] for d in values}
+            # Filter values come from the rounded table, so compare floats rounded
+            col_values = (
+                pd.Series(round_numeric_array(df[col].to_numpy()), index=df.index)
+                if pd.api.types.is_float_dtype(df[col].dtype)
+                else df[col]
+            )
+            # Filter the DataFrame to keep only rows where the column value is in the specified values
+            df = df[col_values.isin(values_set)]
+    return df
+
+
+def column_to_list(col):
+    """Convert a DataFrame column to a JSON-ready list with NaN values as None."""
+    values = col.to_numpy(dtype=object)
+    mask = col.isna().to_numpy()
+    if mask.any():
+        values[mask] = None
+    return values.tolist()
+
+
+def dataframe_to_arrow(df, metadata):
+    """
+    Serialize a DataFrame to an Arrow IPC stream; NaN values become nulls and
+    the metadata dictionary is stored as JSON in the schema metadata.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"nutriview": json.dumps(metadata, default=str).encode(),
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
 def export_data_service(data, is_empty=False):
     """Export data and statistics to a file in the specified format."""
     try:
-        # Fetch the data and statistics from the fetch_data_service
-        output = fetch_data_service(data) if not is_empty else {}
+        output_format = data.get("export_format", "csv")
+        # Handle options json stringify
+        options = json.loads(data.get("options", "{'table': true, 'stats': true}"))
+
+        # Plain text exports without statistics are written chunk by chunk
+        if not is_empty and output_format in ["csv", "txt"] and options["table"]:
+            stream = stream_data_service(data)
+            if stream is not None:
+                if stream.get("error", None):
+                    return stream
+                output_filename = data.get(
+                    "export_filename",
+                    f"exported_data_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+                )
+                file_path = save_chunks_to_file(
+                    stream["chunks"],
+                    f"{output_filename}.{output_format}",
+                    output_format,
+                    data.get("export_path", "dataExport"),
+                    data.get("date_type"),
+                )
+                return {"file_path": file_path}
+
+        # Fetch the data and statistics, usually already computed for the data view
+        output = get_data_result(data) if not is_empty else {}
         if output.get("error", None):
             return output
-        df = pd.DataFrame(output["data"]) if output.get("data", None) else None
+        # Copies, as the stored DataFrames are shared with the other requests
+        df = output["df"].copy() if output.get("df", None) is not None else None
         stats_df = (
-            pd.DataFrame(output["stats"]) if output.get("statsColumns", None) else None
+            output["stats_df"].copy()
+            if output.get("stats_df", None) is not None
+            else None
         )
 
         # Extract the required parameters from the request data
@@ -464,10 +1018,7 @@ def export_data_service(data, is_empty=False):
             "export_filename",
             f"exported_data_{datetime.now().strftime('%Y%m%d%H%M%S')}",
         )
-        output_format = data.get("export_format", "csv")
         output_path = data.get("export_path", "dataExport")
-        # Handle options json stringify
-        options = json.loads(data.get("options", "{'table': true, 'stats': true}"))
         columns_list = (
             json.loads(data.get("columns")) if data.get("columns") != "All" else "All"
         )
@@ -520,10 +1071,33 @@ def export_data_service(data, is_empty=False):
 
 
 def fetch_data_from_db(
-    db_path, table_name, selected_ids, columns, start_date, end_date, date_type
+    db_path,
+    table_name,
+    selected_ids,
+    columns,
+    start_date,
+    end_date,
+    date_type,
+    chunksize=None,
+    interval="daily",
+    month=None,
+    season=None,
+    limit=None,
+    after=None,
+    key_columns=None,
+    count_only=False,
 ):
-    """Fetch data from a SQLite database table with real-to-alias mapping."""
-    conn = sqlite3.connect(safe_join(Config.PATHFILE, db_path))
+    """
+    Fetch data from a SQLite database table with real-to-alias mapping.
+    When count_only is given, only the number of matching rows is returned.
+    When chunksize is given, an iterator of DataFrames with at most chunksize rows is returned.
+    When limit is given, the first limit rows ordered by key_columns whose key values
+    follow after (keyset pagination) are returned with the number of matching rows.
+    For a monthly, yearly or seasonally interval the rows are summed per ID and period
+    inside SQLite; None is returned if the table cannot be aggregated there.
+    """
+    conn = get_connection(safe_join(Config.PATHFILE, db_path))
+    alias_mapping = alias_registry.mapping
 
     # table_name is an alias so replace it with the real table name
     real_table_name = alias_mapping.get(table_name, {}).get("real", table_name)
@@ -532,58 +1106,224 @@ def fetch_data_from_db(
     columns_list = []
     if columns != "All":
         columns_list = columns
-        real_columns = [
-            f'"{alias_mapping.get(table_name, {}).get("columns", {}).get(col, col)}"'
+        real_column_names = [
+            alias_mapping.get(table_name, {}).get("columns", {}).get(col, col)
             for col in columns_list
         ]
-        columns = ",".join(real_columns)
+        columns = ",".join(f'"{col}"' for col in real_column_names)
     else:
-        columns_list = pd.read_sql_query(
+        columns_list = real_column_names = pd.read_sql_query(
             f"PRAGMA table_info('{real_table_name}')", conn
         )["name"].tolist()
 
-    # Start building the base query using real table name
-    query = f"SELECT {columns if columns != 'All' else '*'} FROM '{real_table_name}'"
     params = []
+    conditions = []
 
     ID = next((col for col in columns_list if "ID" in col), "ID")
 
     # Add conditions for selected_ids
     if selected_ids != []:
         placeholders = ",".join(["?"] * len(selected_ids))
-        query += f" WHERE {ID} IN ({placeholders})"
+        conditions.append(f"{ID} IN ({placeholders})")
         params.extend(selected_ids)
 
     # Add date range conditions
     if start_date and end_date:
-        if selected_ids != []:
-            query += f" AND {date_type} BETWEEN ? AND ?"
-        else:
-            query += f" WHERE {date_type} BETWEEN ? AND ?"
+        conditions.append(f"{date_type} BETWEEN ? AND ?")
         params.extend([start_date, end_date])
 
-    # Execute the query with parameters
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    # Start building the base query using real table name
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {columns if columns != 'All' else '*'} FROM '{real_table_name}'{where}"
+
+    if count_only:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM '{real_table_name}'{where}", params
+        ).fetchone()[0]
 
-    # Map real column names back to alias if needed
-    alias_columns = [
-        (
-            alias_mapping.get(real_table_name, {}).get("columns", {}).get(col, col)
-            if ID not in col
-            else col
+    def to_alias_columns(df):
+        # Map real column names back to alias if needed
+        df.columns = [
+            (
+                alias_mapping.get(real_table_name, {}).get("columns", {}).get(col, col)
+                if ID not in col
+                else col
+            )
+            for col in df.columns
+        ]
+        return df
+
+    if limit:
+        keys = ", ".join(
+            f'"{alias_mapping.get(table_name, {}).get("columns", {}).get(col, col)}"'
+            for col in key_columns
+        )
+        page_conditions = list(conditions)
+        page_params = list(params)
+        if after:
+            # Row values compare lexicographically and use the (ID, date) index
+            page_conditions.append(f"({keys}) > ({','.join(['?'] * len(after))})")
+            page_params.extend(after)
+        page_where = (
+            f" WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+        )
+        page_query = (
+            f"SELECT {columns if columns != 'All' else '*'} FROM '{real_table_name}'"
+            f"{page_where} ORDER BY {keys} LIMIT ?"
+        )
+        df = pd.read_sql_query(page_query, conn, params=page_params + [limit])
+        total_rows = conn.execute(
+            f"SELECT COUNT(*) FROM '{real_table_name}'{where}", params
+        ).fetchone()[0]
+        return to_alias_columns(df), total_rows
+
+    # Push monthly, yearly and seasonal sums down into SQLite
+    if interval in ["monthly", "yearly", "seasonally"]:
+        df = aggregate_data_in_db(
+            conn,
+            real_table_name,
+            real_column_names,
+            ID,
+            date_type,
+            conditions,
+            params,
+            interval,
+            month,
+            season,
+        )
+        return to_alias_columns(df) if df is not None else None
+
+    # Execute the query with parameters, iterating the cursor chunk by chunk if requested
+    if chunksize:
+        return map(
+            to_alias_columns,
+            pd.read_sql_query(query, conn, params=params, chunksize=chunksize),
+        )
+
+    return to_alias_columns(pd.read_sql_query(query, conn, params=params))
+
+
+def aggregate_data_in_db(
+    conn,
+    table_name,
+    columns,
+    id_column,
+    date_type,
+    conditions,
+    params,
+    interval,
+    month,
+    season,
+):
+    """
+    Sum the numeric columns per ID and month, year or season inside SQLite, matching
+    the output of aggregate_data. Returns None when the table has no ID column or its
+    dates are not stored as ISO text, so the caller can fall back to pandas.
+    """
+    date_col = f'"{date_type}"'
+    column_types = {
+        row[1]: (row[2] or "").upper()
+        for row in conn.execute(f"PRAGMA table_info('{table_name}')")
+    }
+    sample = conn.execute(
+        f"SELECT {date_col} FROM '{table_name}' WHERE {date_col} IS NOT NULL LIMIT 1"
+    ).fetchone()
+
+    if (
+        id_column not in column_types
+        or date_type not in column_types
+        or sample is None
+        or not re.match(r"^\d{4}-\d{2}-\d{2}", str(sample[0]))
+    ):
+        return None
+
+    # Only columns with a numeric declared type are summed, like numeric_only in pandas
+    numeric_columns = [
+        col
+        for col in columns
+        if col not in [id_column, date_type]
+        and any(
+            numeric_type in column_types.get(col, "")
+            for numeric_type in ["INT", "REAL", "FLOA", "DOUB", "NUM", "DEC"]
         )
-        for col in df.columns
     ]
-    df.columns = alias_columns
+    month_expr = f"CAST(strftime('%m', {date_col}) AS INTEGER)"
+    year_expr = f"strftime('%Y', {date_col})"
+    group_columns = [f'"{id_column}"']
+    select_columns = [f'"{id_column}"']
+    conditions = list(conditions)
+    params = list(params)
 
-    return round_df_except_latlon(df)
+    if interval == "monthly":
+        period_expr = f"strftime('%Y-%m', {date_col})"
+        if month:
+            conditions.append(f"{month_expr} = ?")
+            params.append(int(month))
+    elif interval == "yearly":
+        period_expr = year_expr
+    else:
+        season_expr = (
+            f"CASE WHEN {month_expr} IN (12, 1, 2) THEN 'Winter' "
+            f"WHEN {month_expr} IN (3, 4, 5) THEN 'Spring' "
+            f"WHEN {month_expr} IN (6, 7, 8) THEN 'Summer' ELSE 'Autumn' END"
+        )
+        # Quarters start in December (DJF, MAM, JJA, SON), labelled by their first month
+        period_expr = (
+            f"CASE WHEN {month_expr} = 12 THEN {year_expr} || '-12' "
+            f"WHEN {month_expr} IN (1, 2) THEN printf('%04d-12', {year_expr} - 1) "
+            f"WHEN {month_expr} <= 5 THEN {year_expr} || '-03' "
+            f"WHEN {month_expr} <= 8 THEN {year_expr} || '-06' "
+            f"ELSE {year_expr} || '-09' END"
+        )
+        group_columns.append(season_expr)
+        select_columns.append(f'{season_expr} AS "Season"')
+        if season:
+            conditions.append(f"{season_expr} = ?")
+            params.append(SEASON_NAMES.get(season.lower(), season.title()))
+
+    # Group by the expressions, as "{date_type}" would refer to the daily column
+    group_columns.append(period_expr)
+    select_columns.append(f"{period_expr} AS {date_col}")
+    select_columns += [f'COALESCE(SUM("{col}"), 0) AS "{col}"' for col in numeric_columns]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = (
+        f"SELECT {', '.join(select_columns)} FROM '{table_name}'{where} "
+        f"GROUP BY {', '.join(group_columns)} ORDER BY {', '.join(group_columns)}"
+    )
+    return pd.read_sql_query(query, conn, params=params)
 
 
 def is_running_as_pyinstaller():
     return getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS")
 
 
+def get_export_file_path(export_path, filename):
+    """Resolve the export folder, create it if needed and return the file path."""
+    file_path = (
+        safe_join(Config.PATHFILE_EXPORT, export_path)
+        if not os.path.isabs(export_path) or os.environ.get("WAITRESS") == "1" or not is_running_as_pyinstaller()
+        else export_path
+    )
+
+    os.makedirs(file_path, exist_ok=True)
+    return safe_join(file_path, filename)
+
+
+def save_chunks_to_file(chunks, filename, file_format, export_path, date_type):
+    """Write DataFrame chunks one after another to a CSV or text file."""
+    file_path = get_export_file_path(export_path, filename)
+    sep = "," if file_format == "csv" else " "
+
+    with open(file_path, "w", newline="" if file_format == "csv" else None) as f:
+        for i, chunk in enumerate(chunks):
+            if date_type:
+                chunk[date_type] = pd.to_datetime(chunk[date_type]).dt.date
+            chunk.to_csv(f, index=False, sep=sep, header=i == 0)
+
+    return file_path
+
+
 # Helper function to save data to CSV or text formats
 def save_to_file(
     dataframe1,
@@ -604,14 +1344,7 @@ def save_to_file(
 ):
     """Save two DataFrames to the specified file format sequentially."""
     # Set the file path
-    file_path = (
-        safe_join(Config.PATHFILE_EXPORT, export_path)
-        if not os.path.isabs(export_path) or os.environ.get("WAITRESS") == "1" or not is_running_as_pyinstaller()
-        else export_path
-    )
-
-    os.makedirs(file_path, exist_ok=True)
-    file_path = safe_join(file_path, filename)
+    file_path = get_export_file_path(export_path, filename)
 
     # Map graph types to Matplotlib Axes methods
     GRAPH_TYPE_MAPPING = {
@@ -973,7 +1706,6 @@ def get_table_names(data):
     """
     Get the names of all tables in a SQLite (.db3) or GeoPackage (.gpkg) database.
     """
-    conn = None
     try:
         db_path = data.get("db_path")
         full_path = safe_join(Config.PATHFILE, db_path)
@@ -981,10 +1713,11 @@ def get_table_names(data):
 
         # For regular SQLite (.db3)
         if db_path.endswith(".db3"):
-            conn = sqlite3.connect(full_path)
+            conn = get_connection(full_path)
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
             rows = cursor.fetchall()
+            alias_mapping = alias_registry.mapping
             tables = [
                 alias_mapping.get(row[0], {}).get("alias", row[0]) for row in rows
             ]
@@ -1012,9 +1745,6 @@ def get_table_names(data):
         return {"tables": tables}
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
 
 
 def get_files_and_folders(data):
@@ -1080,6 +1810,8 @@ def get_files_and_folders(data):
                 ) and not file_rel_path.endswith("reprojected.tif"):
                     if file_rel_path.endswith(".db3") and "lookup" not in file_rel_path:
                         folder_tree.add(os.path.join(Config.PATHFILE, file_rel_path))
+                        # Index the ID and date columns of newly discovered databases
+                        schedule_index_advice(os.path.join(dirpath, name))
                     elif file_rel_path.endswith(".db3") and "lookup" in file_rel_path:
                         Config.LOOKUP = file_rel_path
                         lookup_found = True
@@ -1095,12 +1827,11 @@ def get_files_and_folders(data):
                             "name": file_rel_path,
                         }
                     )
-        # Load alias mapping for each database
-        (
-            alias_mapping.update(load_alias_mapping(folder_tree))
-            if not alias_mapping and lookup_found
-            else None
-        )
+        # Load alias mapping for each database, once per version of lookup.db3
+        if lookup_found:
+            alias_registry.load(
+                os.path.join(Config.PATHFILE, Config.LOOKUP), folder_tree
+            )
 
         return {"files_and_folders": files_and_folders}
     except Exception as e:
@@ -1151,7 +1882,10 @@ def aggregate_data(df, interval, method, date_type, month, season):
             [ID, "Season", pd.Grouper(key=date_type, freq="QS-DEC")]
         ).sum(numeric_only=True)
         if season:
-            resampled_df = resampled_df[resampled_df["Season"] == season.title()]
+            resampled_df = resampled_df[
+                resampled_df.index.get_level_values("Season")
+                == SEASON_NAMES.get(season.lower(), season.title())
+            ]
     else:
         resampled_df = df
 
@@ -1169,7 +1903,7 @@ def aggregate_data(df, interval, method, date_type, month, season):
         resampled_df[date_type] = resampled_df[date_type].dt.strftime("%Y-%m-%d")
     stats_df = calculate_statistics(resampled_df, method, date_type)
 
-    return round_df_except_latlon(resampled_df), round_df_except_latlon(stats_df)
+    return resampled_df, stats_df
 
 
 def round_numeric_values(value, col_name=None):
@@ -1187,14 +1921,50 @@ def round_numeric_values(value, col_name=None):
     return value
 
 
+def round_numeric_array(values):
+    """
+    Vectorized counterpart of round_numeric_values for a float NumPy array:
+    4 decimal places where |value| < 0.01, otherwise 2 decimal places, giving the
+    same values as Python's round.
+    """
+    decimals = np.where(np.abs(values) < 0.01, 4, 2)
+    scale = 10.0**decimals
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * scale
+        rounded = np.round(scaled) / scale
+        # Scaling is inexact, values about halfway between two roundings are
+        # rounded by Python's round from their exact decimal value
+        halfway = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 4 * np.spacing(
+            np.abs(scaled)
+        )
+    for i in np.flatnonzero(halfway):
+        rounded[i] = round(float(values[i]), int(decimals[i]))
+    # Values this large have no decimals left to round
+    return np.where(np.abs(values) >= 2**52, values, rounded)
+
+
 def round_df_except_latlon(df):
+    """
+    Round every numeric column of the DataFrame column-wise, leaving the
+    Latitude and Longitude columns untouched.
+    """
     # Do not round Latitude or Longitude columns
     skip_cols = {"latitude", "longitude"}
-    return df.apply(
-        lambda col: (
-            col if col.name.lower() in skip_cols else col.apply(round_numeric_values)
-        )
-    )
+    df = df.copy()
+    for i, col_name in enumerate(df.columns):
+        if str(col_name).lower() in skip_cols:
+            continue
+        col = df.iloc[:, i]
+        if pd.api.types.is_float_dtype(col.dtype):
+            df.iloc[:, i] = round_numeric_array(col.to_numpy())
+        elif col.dtype == object and pd.api.types.infer_dtype(
+            col, skipna=True
+        ) not in ("string", "empty"):
+            # Mixed object columns still need the per-value rounding
+            df.iloc[:, i] = col.map(round_numeric_values)
+        # Integer columns are left as is, rounding would not change them, and so
+        # are boolean columns, which the per-value rounding turned into integers
+    return df
 
 
 def calculate_statistics(df, statistics, date_type):
@@ -1255,107 +2025,147 @@ def calculate_statistics(df, statistics, date_type):
     stats_df.reset_index(inplace=True)
     stats_df.rename(columns={"index": "Statistics"}, inplace=True)
 
-    return round_df_except_latlon(stats_df)
+    return stats_df
 
 
-def load_alias_mapping(folder_tree):
-    """Load alias mapping from the lookup.db3 database."""
-    conn = sqlite3.connect(os.path.join(Config.PATHFILE, Config.LOOKUP))
-    alias_map = {}
+def get_help_attributes():
+    """
+    Return the Help_ID -> attribute set mapping of the HelpMetadata table in
+    Help.db3, parsed once per version of the file and shared by all threads.
+    Returns an empty mapping when there is no usable Help.db3.
+    """
+    global help_attributes_cache
+    help_db_path = os.path.join(Config.BASE_DIR, "Help.db3")
+    try:
+        stat = os.stat(help_db_path)
+    except OSError:
+        return {}
+    signature = (stat.st_mtime_ns, stat.st_size)
 
-    # Query the alias tables (Hydroclimate, BMP, scenario_2)
-    for table in folder_tree:
-        # Extract the table name from the path
-        table = os.path.basename(table).replace(".db3", "")
+    with help_attributes_lock:
+        if help_attributes_cache and help_attributes_cache[0] == signature:
+            return help_attributes_cache[1]
 
-        query = f"SELECT * FROM '{table}'"
-        df = pd.read_sql_query(query, conn)
+        help_attributes = {}
+        try:
+            rows = (
+                get_connection(help_db_path)
+                .execute("SELECT Help_ID, Attributes FROM HelpMetadata")
+                .fetchall()
+            )
+        except sqlite3.Error:
+            rows = []
+        for help_id, attr_str in rows:
+            try:
+                attrs = json.loads(attr_str)
+            except (json.JSONDecodeError, TypeError):
+                attrs = None
+            help_attributes[help_id] = frozenset(
+                attrs if isinstance(attrs, list) else []
+            )
 
-        for _, row in df.iterrows():
-            real_table = row["Table Name"]
-            alias_table = row["Table Alias"]
-            real_column = row["Column Name"]
-            alias_column = row["Column Alias"]
+        help_attributes_cache = (signature, help_attributes)
+        return help_attributes
 
-            # Map real-to-alias and alias-to-real for both tables and columns
-            alias_map.setdefault(real_table, {}).setdefault("alias", alias_table)
-            alias_map[real_table].setdefault("columns", {})[real_column] = alias_column
-            alias_map.setdefault(alias_table, {}).setdefault("real", real_table)
-            alias_map[alias_table].setdefault("columns", {})[alias_column] = real_column
 
-    conn.close()
-    return alias_map
+def invalidate_help_attributes():
+    """Drop the parsed HelpMetadata, after Help.db3 was rewritten."""
+    global help_attributes_cache
+    with help_attributes_lock:
+        help_attributes_cache = None
 
 
 def get_columns_and_time_range(db_path, table_name):
     """Fetch column names and time range from a SQLite database table with real-to-alias mapping."""
 
     try:
+        alias_mapping = alias_registry.mapping
         # Convert the table alias to its real name if necessary
         real_table_name = alias_mapping.get(table_name, {}).get("real", table_name)
+        full_path = safe_join(Config.PATHFILE, db_path)
 
-        # Connect to the database
-        conn = sqlite3.connect(safe_join(Config.PATHFILE, db_path))
-
-        # Fetch column information using PRAGMA for the real table name
-        query = f"PRAGMA table_info('{real_table_name}')"
-        cursor = conn.cursor()
-        cursor.execute(query)
-        columns = [row[1] for row in cursor.fetchall()]
+        # Reuse the metadata computed for the current version of the database file
+        metadata = load_table_metadata(full_path, real_table_name)
+        if metadata is None:
+            metadata = read_table_metadata(get_connection(full_path), real_table_name)
+            save_table_metadata(full_path, real_table_name, metadata)
 
         # Convert real column names to alias names (if available in the mapping)
         alias_columns = [
             alias_mapping.get(real_table_name, {}).get("columns", {}).get(col, col)
-            for col in columns
+            for col in metadata["columns"]
         ]
 
-        # Initialize variables
-        start_date = end_date = date_type = interval = None
-
-        # Check and query for specific date/time columns (using real column names)
-        for date_col, dtype, inter in [
-            ("Time", "Time", "daily"),
-            ("Date", "Date", "daily"),
-            ("Month", "Month", "monthly"),
-            ("Year", "Year", "yearly"),
-        ]:
-            if date_col in columns:
-                df = pd.read_sql_query(
-                    f"SELECT {date_col} FROM '{real_table_name}'", conn
-                )
-                if date_col in ["Time", "Date"]:
+        # Return alias column names instead of real ones
+        return {**metadata, "columns": alias_columns}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def read_table_metadata(conn, real_table_name):
+    """Read the real column names, time range and IDs of a table using SQL aggregates."""
+    # Fetch column information using PRAGMA for the real table name
+    query = f"PRAGMA table_info('{real_table_name}')"
+    cursor = conn.cursor()
+    cursor.execute(query)
+    columns = [row[1] for row in cursor.fetchall()]
+
+    # Initialize variables
+    start_date = end_date = date_type = interval = None
+
+    # Check and query for specific date/time columns (using real column names)
+    for date_col, dtype, inter in [
+        ("Time", "Time", "daily"),
+        ("Date", "Date", "daily"),
+        ("Month", "Month", "monthly"),
+        ("Year", "Year", "yearly"),
+    ]:
+        if date_col in columns:
+            # A lone MIN or MAX is a single lookup at either end of the date index,
+            # both in one SELECT would scan the whole index
+            min_value, max_value = cursor.execute(
+                f'SELECT (SELECT MIN("{date_col}") FROM \'{real_table_name}\'), '
+                f'(SELECT MAX("{date_col}") FROM \'{real_table_name}\')'
+            ).fetchone()
+            if date_col in ["Time", "Date"]:
+                iso_date = r"^\d{4}-\d{2}-\d{2}"
+                if re.match(iso_date, str(min_value)) and re.match(
+                    iso_date, str(max_value)
+                ):
+                    start_date = str(min_value)[:10]
+                    end_date = str(max_value)[:10]
+                else:
+                    # Dates not stored as ISO text do not sort chronologically in SQL
+                    df = pd.read_sql_query(
+                        f"SELECT {date_col} FROM '{real_table_name}'", conn
+                    )
                     df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
                     start_date = df[date_col].min().strftime("%Y-%m-%d")
                     end_date = df[date_col].max().strftime("%Y-%m-%d")
-                elif date_col in ["Month", "Year"]:
-                    start_date = int(df[date_col].min())
-                    end_date = int(df[date_col].max())
-                date_type = dtype
-                interval = inter
-                break
-
-        # Get list of IDs if an ID column exists, without querying unnecessary data
-        id_column = next((col for col in columns if "ID" in col), None)
-        ids = []
-        if id_column:
-            id_query = f"SELECT DISTINCT {id_column} FROM '{real_table_name}'"
-            id_df = pd.read_sql_query(id_query, conn)
-            ids = id_df[id_column].tolist()
+            elif date_col in ["Month", "Year"]:
+                start_date = int(min_value)
+                end_date = int(max_value)
+            date_type = dtype
+            interval = inter
+            break
+
+    # Get list of IDs if an ID column exists, scanning the (ID, date) index rather
+    # than the table rows
+    id_column = next((col for col in columns if "ID" in col), None)
+    ids = []
+    if id_column:
+        id_query = f"SELECT DISTINCT {id_column} FROM '{real_table_name}'"
+        ids = [row[0] for row in cursor.execute(id_query).fetchall()]
 
-        # Return alias column names instead of real ones
-        return {
-            "columns": alias_columns,
-            "start_date": start_date,
-            "end_date": end_date,
-            "id_column": id_column or "",
-            "ids": ids,
-            "date_type": date_type,
-            "interval": interval,
-        }
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        conn.close()
+    return {
+        "columns": columns,
+        "start_date": start_date,
+        "end_date": end_date,
+        "id_column": id_column or "",
+        "ids": ids,
+        "date_type": date_type,
+        "interval": interval,
+    }
 
 
 def get_multi_columns_and_time_range(data):
@@ -1571,46 +2381,108 @@ def bounds_overlap_or_similar(bounds1, bounds2, tolerance=0.0001):
     return True, bounds1
 
 
-def get_raster_normalized(band):
+def band_windows(band):
     """
-    Normalize a raster band by computing the min and max values while ignoring NoData values.
+    Yield the (row offset, row count) windows covering a raster band, made of
+    whole rows of blocks and holding about RASTER_WINDOW_PIXELS pixels.
     """
-    # Read raster data as a NumPy array
-    raster_data = band.ReadAsArray()
+    _, block_rows = band.GetBlockSize()
+    block_rows = max(block_rows, 1)
+    rows = RASTER_WINDOW_PIXELS // max(band.XSize, 1) // block_rows * block_rows
+    rows = max(rows, block_rows)
+    for y_offset in range(0, band.YSize, rows):
+        yield y_offset, min(rows, band.YSize - y_offset)
+
+
+def read_band_window(band, y_offset, rows, no_data_value):
+    """Read a window of a band as floats with the mask of its valid pixels."""
+    values = band.ReadAsArray(0, y_offset, band.XSize, rows).astype(np.float64)
+    valid = ~np.isnan(values)
+    if no_data_value is not None:
+        valid &= values != no_data_value
+    return values, valid
+
 
-    # Get the NoData value
+def get_band_statistics(band):
+    """
+    Compute the min and max of a raster band ignoring NoData and NaN values, in one
+    pass over block windows so memory does not grow with the raster size.
+    Returns min and max as None when the band has no valid pixels.
+    """
     no_data_value = band.GetNoDataValue()
+    raster_min = raster_max = None
+    for y_offset, rows in band_windows(band):
+        values, valid = read_band_window(band, y_offset, rows, no_data_value)
+        if not valid.any():
+            continue
+        window = values[valid]
+        window_min, window_max = float(window.min()), float(window.max())
+        raster_min = window_min if raster_min is None else min(raster_min, window_min)
+        raster_max = window_max if raster_max is None else max(raster_max, window_max)
+    return {"min": raster_min, "max": raster_max, "nodata": no_data_value}
 
-    # Mask NoData values if present
-    if no_data_value is not None:
-        raster_data = np.ma.masked_equal(raster_data, no_data_value)
 
-    # Compute min and max while ignoring NoData
-    raster_min = (
-        np.min(raster_data) if np.ma.is_masked(raster_data) else np.nanmin(raster_data)
-    )
-    raster_max = (
-        np.max(raster_data) if np.ma.is_masked(raster_data) else np.nanmax(raster_data)
-    )
-
-    # Normalize the raster while avoiding division by zero
-    if raster_max - raster_min == 0:
-        raster_normalized = np.zeros_like(
-            raster_data
-        )  # If constant values, return all zeros
+def render_band_png(band, cmap, output_path, max_size, statistics=None):
+    """
+    Render a raster band to an RGBA PNG of at most max_size pixels on its longest
+    side, with a colormap normalized with the band statistics. NoData pixels are
+    transparent. The band is read once at the image size, from its overviews when
+    it has some, so a warped VRT is only warped at that size. Without statistics,
+    the min and max of the image are used. Returns the statistics.
+    """
+    values = read_band_preview(band, max_size)
+    if statistics is None:
+        valid_count = values.count()
+        statistics = {
+            "min": float(values.min()) if valid_count else None,
+            "max": float(values.max()) if valid_count else None,
+            "nodata": band.GetNoDataValue(),
+        }
+    raster_min, raster_max = statistics["min"], statistics["max"]
+
+    # Colormap lookup table, indexed like the colormap maps values in [0, 1]
+    lut = (cmap(np.arange(cmap.N))[:, :4] * 255).astype(np.uint8)
+    valid = ~np.ma.getmaskarray(values)
+    if raster_min is None or raster_max - raster_min == 0:
+        # If constant values, every pixel takes the first color
+        index = np.zeros(values.shape, dtype=np.intp)
     else:
-        raster_normalized = (raster_data - raster_min) / (raster_max - raster_min)
+        normalized = np.where(
+            valid, (values.data - raster_min) / (raster_max - raster_min), 0
+        )
+        index = np.clip((normalized * cmap.N).astype(np.intp), 0, cmap.N - 1)
 
-    return raster_data, raster_normalized, raster_min, raster_max
+    rgba_image = lut[index]
+    rgba_image[..., 3] = 255
+    # Set the alpha channel for transparency (No-data = Transparent)
+    rgba_image[~valid] = 0
+    Image.fromarray(rgba_image, mode="RGBA").save(output_path, "PNG")
+    return statistics
 
 
-def get_raster_color_levels(band, colormap, num_classes=5):
+def read_band_preview(band, max_size):
     """
-    Generate color levels for a raster band, using its native color mapping.
+    Read a raster band resampled to at most max_size pixels on its longest side,
+    from its overviews when it has some, as a masked array without NoData values.
     """
-    _, _, min_value, max_value = get_raster_normalized(band)
+    scale = min(1.0, max_size / max(band.XSize, band.YSize))
+    values = band.ReadAsArray(
+        buf_xsize=max(1, int(band.XSize * scale)),
+        buf_ysize=max(1, int(band.YSize * scale)),
+    ).astype(np.float64)
+    valid = ~np.isnan(values)
+    no_data_value = band.GetNoDataValue()
+    if no_data_value is not None:
+        valid &= values != no_data_value
+    return np.ma.masked_array(values, mask=~valid)
+
 
-    if min_value == max_value:
+def get_raster_color_levels(min_value, max_value, colormap, num_classes=5):
+    """
+    Generate color levels for a raster band from its min and max, using its native
+    color mapping.
+    """
+    if min_value is None or min_value == max_value:
         return []  # Avoid division by zero for constant rasters
 
     # Define classification breakpoints
@@ -1646,42 +2518,303 @@ def get_metadata_colormap(band):
     return plt.get_cmap(colormap_name)
 
 
-def get_geojson_metadata(geojson_path):
-    """Extract metadata from an existing GeoJSON file."""
-    if not os.path.exists(geojson_path):
+def tile_bounds(z, x, y):
+    """Return the (min_x, min_y, max_x, max_y) Web Mercator bounds of an XYZ tile."""
+    size = 2 * WEB_MERCATOR_EXTENT / (1 << z)
+    min_x = -WEB_MERCATOR_EXTENT + x * size
+    max_y = WEB_MERCATOR_EXTENT - y * size
+    return min_x, max_y - size, min_x + size, max_y
+
+
+def split_tile_layer(layer):
+    """
+    Split a tile layer, a data path relative to PATHFILE such as "Geospatial/dem.tif"
+    or "Geospatial/GeoDB.gpkg:dem" for a GeoPackage layer, into its existing source
+    file and GeoPackage layer name. Returns (None, None) if invalid.
+    """
+    rel_path, separator, table = layer.partition(".gpkg:")
+    if separator:
+        source_path = safe_join(Config.PATHFILE, rel_path + ".gpkg")
+    else:
+        source_path, table = safe_join(Config.PATHFILE, layer), None
+    if not source_path or not os.path.exists(source_path):
+        return None, None
+    return source_path, table
+
+
+def resolve_raster_layer(layer):
+    """
+    Resolve a raster tile layer to its source file and GDAL dataset name.
+    Returns (None, None) if invalid.
+    """
+    source_path, table = split_tile_layer(layer)
+    if source_path is None:
+        return None, None
+    if table:
+        return source_path, f"GPKG:{source_path}:{table}"
+    return source_path, source_path
+
+
+def build_tile_source(dataset_name, output_path):
+    """
+    Copy a raster to a tiled GeoTIFF with overviews, so tiles at every zoom level
+    read only the blocks they cover. Returns the band min/max used to normalize
+    the tiles like the full image and the bounds in Web Mercator.
+    """
+    source = gdal.Open(dataset_name)
+    if source is None:
         return None
 
-    with open(geojson_path, "r") as file:
-        geojson_data = json.load(file)
+    tiled = gdal.Translate(
+        output_path,
+        source,
+        format="GTiff",
+        creationOptions=["TILED=YES", "COMPRESS=DEFLATE", "BIGTIFF=IF_SAFER"],
+    )
+    if tiled is None:
+        return None
 
-    features = geojson_data.get("features", [])
-    feature_count = len(features)
+    # Halve the resolution until the whole raster fits in one tile
+    levels = []
+    factor = 2
+    while max(tiled.RasterXSize, tiled.RasterYSize) / factor >= TILE_SIZE / 2:
+        levels.append(factor)
+        factor *= 2
+    if levels:
+        # Nearest neighbour keeps the class values of land cover rasters
+        tiled.BuildOverviews("NEAREST", levels)
+
+    band = tiled.GetRasterBand(1)
+    raster_min, raster_max = band.ComputeRasterMinMax(False)
+
+    # Raster bounds in Web Mercator to answer tiles outside the raster without reading it
+    bounds = None
+    source_srs = osr.SpatialReference()
+    if source_srs.ImportFromWkt(tiled.GetProjection()) == 0:
+        target_srs = osr.SpatialReference()
+        target_srs.ImportFromEPSG(3857)
+        for srs in (source_srs, target_srs):
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        geotransform = tiled.GetGeoTransform()
+        x_min = geotransform[0]
+        y_max = geotransform[3]
+        x_max = x_min + geotransform[1] * tiled.RasterXSize
+        y_min = y_max + geotransform[5] * tiled.RasterYSize
+        try:
+            bounds = list(
+                osr.CoordinateTransformation(source_srs, target_srs).TransformBounds(
+                    x_min, y_min, x_max, y_max, 21
+                )
+            )
+        except Exception:
+            bounds = None
 
-    bbox = geojson_data.get("bbox", [])
+    tiled = None
+    return {"min": float(raster_min), "max": float(raster_max), "bounds": bounds}
 
-    if bbox:
-        x_min, x_max, y_min, y_max = bbox[0], bbox[2], bbox[1], bbox[3]
-    else:
-        x_min, x_max, y_min, y_max = (
-            float("inf"),
-            float("-inf"),
-            float("inf"),
-            float("-inf"),
+
+def empty_tile():
+    """Return a transparent PNG tile for tiles outside the raster."""
+    global empty_tile_png
+    if empty_tile_png is None:
+        buffer = io.BytesIO()
+        Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0)).save(buffer, "PNG")
+        empty_tile_png = buffer.getvalue()
+    return empty_tile_png
+
+
+def render_raster_tile(layer, z, x, y):
+    """
+    Render one 256x256 XYZ tile of a raster layer with its metadata colormap,
+    reading only the overview level matching the zoom. Tiles are kept in the
+    geospatial cache. Returns {"file_path": ...}, {"png": bytes} for a tile outside
+    the raster, or an error dictionary.
+    """
+    try:
+        source_path, dataset_name = resolve_raster_layer(layer)
+        if source_path is None:
+            return {"error": "Invalid raster layer."}
+        sub_layer = dataset_name if dataset_name != source_path else None
+
+        prepared = geo_cache.get_or_create(
+            source_path,
+            sub_layer,
+            {"format": "tif", "tiled": True, "overviews": True},
+            ".tif",
+            lambda output_path: build_tile_source(dataset_name, output_path),
+        )
+        if prepared is None:
+            return {"error": "Cannot open the raster layer."}
+        tiled_path, tile_source = prepared
+
+        min_x, min_y, max_x, max_y = tile_bounds(z, x, y)
+        bounds = tile_source["bounds"]
+        if bounds and (
+            max_x <= bounds[0]
+            or min_x >= bounds[2]
+            or max_y <= bounds[1]
+            or min_y >= bounds[3]
+        ):
+            return {"png": empty_tile()}
+
+        def render_tile(output_path):
+            # The warper picks the overview level closest to the tile resolution
+            warped = gdal.Warp(
+                "",
+                tiled_path,
+                format="MEM",
+                outputBounds=(min_x, min_y, max_x, max_y),
+                width=TILE_SIZE,
+                height=TILE_SIZE,
+                dstSRS="EPSG:3857",
+                resampleAlg="near",
+                dstAlpha=True,
+                multithread=True,
+                warpOptions=[f"NUM_THREADS={Config.WARP_THREADS}"],
+            )
+            if warped is None:
+                return None
+            band = warped.GetRasterBand(1)
+            values = band.ReadAsArray().astype(float)
+            valid = warped.GetRasterBand(warped.RasterCount).ReadAsArray() > 0
+            valid &= ~np.isnan(values)
+
+            raster_min, raster_max = tile_source["min"], tile_source["max"]
+            normalized = (
+                np.zeros_like(values)
+                if raster_max - raster_min == 0
+                else (values - raster_min) / (raster_max - raster_min)
+            )
+
+            cmap = get_metadata_colormap(gdal.Open(tiled_path).GetRasterBand(1))
+            rgba_image = (cmap(normalized)[:, :, :4] * 255).astype(np.uint8)
+            # Pixels outside the raster or with NoData are transparent
+            rgba_image[..., 3] = np.where(valid, 255, 0)
+            Image.fromarray(rgba_image, mode="RGBA").save(output_path, "PNG")
+            warped = None
+            return {}
+
+        tile = geo_cache.get_or_create(
+            source_path,
+            sub_layer,
+            {"format": "png", "tile": [z, x, y]},
+            ".png",
+            render_tile,
         )
+        if tile is None:
+            return {"error": "Cannot render the raster tile."}
+        return {"file_path": tile[0]}
+    except Exception as e:
+        return {"error": str(e)}
+
 
-    field_names = []
+def build_vector_tile_source(file_path, layer_name, output_path):
+    """
+    Copy a vector layer to a FlatGeobuf in Web Mercator with a spatial index, so a
+    tile reads only the features it covers. Returns the field names and the
+    Web Mercator bounds of the layer.
+    """
+    gdf = pyogrio.read_dataframe(file_path, layer=layer_name)
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:26917")  # Default UTM Zone 17N if unspecified
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty].to_crs("EPSG:3857")
+    fields = [column for column in gdf.columns if column != gdf.geometry.name]
 
-    for feature in features:
-        geom = feature.get("geometry", {})
-        props = feature.get("properties", {})
-        # Collect property field names
-        field_names.extend(list(props.keys()))
+    if gdf.empty:
+        # Nothing to index, every tile of the layer is empty
+        open(output_path, "wb").close()
+        return {"fields": fields, "bounds": None}
 
-    return {
-        "feature_count": feature_count,
-        "extent": (round(x_min, 6), round(x_max, 6), round(y_min, 6), round(y_max, 6)),
-        "field_names": list(dict.fromkeys(field_names)),
-    }
+    pyogrio.write_dataframe(gdf, output_path, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+    return {"fields": fields, "bounds": [float(v) for v in gdf.total_bounds]}
+
+
+def vector_tile_fields(fields, requested):
+    """
+    Return the fields sent with vector tiles: the ID fields used to color and
+    select features, and the requested ones shown in tooltips.
+    """
+    return [
+        field
+        for field in fields
+        if ID_FIELD_PATTERN.search(field) or field in requested
+    ]
+
+
+def render_vector_tile(layer, z, x, y, requested_fields=()):
+    """
+    Render one XYZ Mapbox Vector Tile of a shapefile or GeoPackage layer. Features
+    are clipped to the tile and its buffer, simplified to the tile resolution and
+    carry only the ID fields and the requested fields. Tiles are kept in the
+    geospatial cache. Returns {"file_path": ...}, {"pbf": b""} for a tile outside
+    the layer, or an error dictionary.
+    """
+    try:
+        source_path, layer_name = split_tile_layer(layer)
+        if source_path is None:
+            return {"error": "Invalid vector layer."}
+
+        prepared = geo_cache.get_or_create(
+            source_path,
+            layer_name,
+            {"format": "fgb", "crs": "EPSG:3857"},
+            ".fgb",
+            lambda output_path: build_vector_tile_source(
+                source_path, layer_name, output_path
+            ),
+        )
+        if prepared is None:
+            return {"error": "Cannot open the vector layer."}
+        indexed_path, tile_source = prepared
+
+        min_x, min_y, max_x, max_y = tile_bounds(z, x, y)
+        scale = VECTOR_TILE_EXTENT / (max_x - min_x)
+        # Features within the buffer are kept so strokes do not end at tile edges
+        margin = VECTOR_TILE_BUFFER / scale
+        query_bounds = (min_x - margin, min_y - margin, max_x + margin, max_y + margin)
+        bounds = tile_source["bounds"]
+        if not bounds or (
+            query_bounds[2] <= bounds[0]
+            or query_bounds[0] >= bounds[2]
+            or query_bounds[3] <= bounds[1]
+            or query_bounds[1] >= bounds[3]
+        ):
+            return {"pbf": b""}
+
+        fields = vector_tile_fields(tile_source["fields"], requested_fields)
+
+        def render_tile(output_path):
+            gdf = pyogrio.read_dataframe(indexed_path, bbox=query_bounds, columns=fields)
+            geometries = shapely.clip_by_rect(np.asarray(gdf.geometry), *query_bounds)
+            # Tile coordinates have their origin at the top left corner
+            geometries = shapely.transform(
+                geometries, lambda coords: (coords - [min_x, max_y]) * [scale, -scale]
+            )
+            geometries = shapely.simplify(geometries, VECTOR_TILE_TOLERANCE)
+
+            name = layer_name or os.path.splitext(os.path.basename(source_path))[0]
+            tile_layer = encode_layer(
+                name,
+                geometries,
+                gdf[fields].to_dict("records"),
+                VECTOR_TILE_EXTENT,
+            )
+            with open(output_path, "wb") as f:
+                f.write(encode_tile([tile_layer]))
+            return {}
+
+        tile = geo_cache.get_or_create(
+            source_path,
+            layer_name,
+            {"format": "mvt", "tile": [z, x, y], "fields": fields},
+            ".pbf",
+            render_tile,
+        )
+        if tile is None:
+            return {"error": "Cannot render the vector tile."}
+        return {"file_path": tile[0]}
+    except Exception as e:
+        return {"error": str(e)}
 
 
 def generate_dynamic_colors(values, colormap_name, num_classes=5):
@@ -1769,8 +2902,8 @@ def fetch_geojson_colors(data):
     """
     Fetches data from `fetch_data_service`, applies feature statistics, and generates geojson color mapping.
     """
-    # Step 1: Fetch raw data
-    output = fetch_data_service(data)
+    # Step 1: Fetch raw data, usually already computed for the data view
+    output = get_data_result(data)
     new_feature = output.get("new_feature", None)
     feature = new_feature or data.get("feature", "value")
     feature_statistic = data.get("feature_statistic", "mean")
@@ -1781,10 +2914,10 @@ def fetch_geojson_colors(data):
     if output.get("error", None):
         return output
 
-    if "data" not in output:
+    if "df" not in output:
         return {"error": "No data found"}
 
-    df = pd.DataFrame(output["data"])
+    df = output["df"]
     ID = next((col for col in df.columns if "ID" in col), None)
 
     if ID is None:
@@ -1849,6 +2982,173 @@ def fetch_geojson_colors(data):
     }
 
 
+def read_vector_layer(file_path, layer_name):
+    """
+    Read a shapefile or GeoPackage layer in bulk through Arrow and reproject it to
+    WGS84 with vectorized coordinate transformations. Returns the GeoDataFrame and
+    the source CRS, or (None, None) if the file cannot be opened.
+    """
+    try:
+        gdf = pyogrio.read_dataframe(file_path, layer=layer_name, use_arrow=True)
+    except pyogrio.errors.DataSourceError:
+        return None, None
+
+    # Handle Spatial Reference System
+    if gdf.crs is not None:
+        authority = gdf.crs.to_authority()
+        default_crs = f"{authority[0]}:{authority[1]}" if authority else "EPSG:4326"
+    else:
+        # Default UTM Zone 17N if unspecified
+        gdf = gdf.set_crs("EPSG:26917")
+        default_crs = "EPSG:26917"
+
+    # Reproject all geometries at once (longitude-latitude axis order)
+    if not gdf.crs.equals("EPSG:4326"):
+        gdf = gdf.to_crs("EPSG:4326")
+    return gdf, default_crs
+
+
+def write_vector_layer(gdf, output_path, output_format, precision=None):
+    """
+    Write a WGS84 layer as GeoJSON, with coordinates rounded to precision decimals
+    if given, or as FlatGeobuf with a spatial index.
+    """
+    if output_format == "fgb":
+        options = {"SPATIAL_INDEX": "YES"}
+    else:
+        options = {"RFC7946": "YES", "WRITE_BBOX": "YES"}
+        if precision is not None:
+            options["COORDINATE_PRECISION"] = precision
+    pyogrio.write_dataframe(
+        gdf,
+        output_path,
+        layer="layer",
+        driver=VECTOR_FORMATS[output_format],
+        use_arrow=True,
+        **options,
+    )
+
+
+def convert_vector_file(file_path, layer_name, output_path, output_format):
+    """
+    Reproject a shapefile or GeoPackage layer to WGS84 and write it as GeoJSON or
+    FlatGeobuf. Returns the Leaflet bounds, the field names, the source CRS and the
+    main geometry type, or None if the file cannot be opened.
+    """
+    gdf, default_crs = read_vector_layer(file_path, layer_name)
+    if gdf is None:
+        return None
+
+    properties = [column for column in gdf.columns if column != gdf.geometry.name]
+
+    # Calculate bounds in WGS84
+    x_min, y_min, x_max, y_max = (
+        gdf.total_bounds if not gdf.geometry.is_empty.all() else (0, 0, 0, 0)
+    )
+
+    # Swap longitude & latitude order for Leaflet (Leaflet expects [[minY, minX], [maxY, maxX]])
+    bounds = [
+        [float(y_min), float(x_min)],
+        [float(y_max), float(x_max)],
+    ]
+
+    geometry_types = gdf.geom_type.dropna()
+    geometry_type = geometry_types.mode()[0] if not geometry_types.empty else None
+
+    write_vector_layer(gdf, output_path, output_format)
+
+    return {
+        "bounds": bounds,
+        "properties": properties,
+        "default_crs": default_crs,
+        "geometry_type": geometry_type,
+    }
+
+
+def simplification_level(zoom=None, tolerance=None):
+    """
+    Return the (tolerance, precision) of the simplified GeoJSON level to use for
+    a map zoom or a maximum tolerance in degrees, or None for full resolution.
+    """
+    for max_zoom, level_tolerance, precision in GEOJSON_LEVELS:
+        if (zoom is not None and zoom <= max_zoom) or (
+            tolerance is not None and level_tolerance <= tolerance
+        ):
+            return level_tolerance, precision
+    return None
+
+
+def simplify_vector_layer(
+    input_path, output_path, output_format, tolerance, precision
+):
+    """
+    Write a simplified copy of a converted WGS84 layer, GeoJSON coordinates are
+    rounded to precision decimals. Polygon coverages (subareas, subbasins) are
+    simplified as a whole so neighbours keep their shared boundaries, other
+    layers are simplified per feature preserving topology.
+    """
+    gdf = pyogrio.read_dataframe(input_path, use_arrow=True)
+    geometries = np.asarray(gdf.geometry)
+    polygonal = gdf.geom_type.isin(["Polygon", "MultiPolygon"]).all()
+    # Coverage functions need shapely 2.1, older versions simplify each polygon
+    coverage = hasattr(shapely, "coverage_simplify")
+    if polygonal and coverage and shapely.coverage_is_valid(geometries):
+        gdf = gdf.set_geometry(
+            shapely.coverage_simplify(geometries, tolerance), crs=gdf.crs
+        )
+    else:
+        gdf = gdf.set_geometry(
+            gdf.geometry.simplify(tolerance, preserve_topology=True)
+        )
+
+    write_vector_layer(gdf, output_path, output_format, precision)
+    return {}
+
+
+def convert_vector_layer(
+    source_path, file_path, layer_name, level=None, output_format="geojson"
+):
+    """
+    Return (path, metadata) of a vector layer reprojected to WGS84 as GeoJSON or
+    FlatGeobuf, converted once per version of the source, or None if it cannot be
+    opened. With a simplification level (tolerance, precision) the simplified
+    copy is returned, also built once per version of the source.
+    """
+    suffix = "." + output_format
+    converted = geo_cache.get_or_create(
+        source_path,
+        layer_name,
+        {"format": output_format, "crs": "EPSG:4326"},
+        suffix,
+        lambda output_path: convert_vector_file(
+            file_path, layer_name, output_path, output_format
+        ),
+    )
+    if converted is None or level is None:
+        return converted
+
+    converted_path, metadata = converted
+    tolerance, precision = level
+    simplified = geo_cache.get_or_create(
+        source_path,
+        layer_name,
+        {
+            "format": output_format,
+            "crs": "EPSG:4326",
+            "tolerance": tolerance,
+            "precision": precision,
+        },
+        suffix,
+        lambda output_path: simplify_vector_layer(
+            converted_path, output_path, output_format, tolerance, precision
+        ),
+    )
+    if simplified is None:
+        return None
+    # Bounds, fields and CRS are those of the full resolution layer
+    return simplified[0], metadata
+
+
 def process_geospatial_data(data):
     """
     Process a geospatial file (shapefile or raster) and return GeoJSON/Tiff Image Url, bounds, and center.
@@ -1857,13 +3157,23 @@ def process_geospatial_data(data):
     file_paths = map(
         lambda x: safe_join(Config.PATHFILE, x), json.loads(data.get("file_paths"))
     )
-    layer_names_map = json.loads(data.get("layer_names", "{'GeoDB.gpkg': []}"))
+    layer_names_map = json.loads(data.get("layer_names", '{"GeoDB.gpkg": []}'))
+    # Full resolution unless a map zoom or a simplification tolerance is given
+    level = simplification_level(
+        int(data["zoom"]) if data.get("zoom") else None,
+        float(data["tolerance"]) if data.get("tolerance") else None,
+    )
     combined_geojson = {}
     combined_bounds = None
     raster_color_levels = []
     combined_properties = []
     tool_tip = {}
     image_urls = []
+    tile_urls = []
+    vector_tile_urls = []
+    # FlatGeobuf layers are downloaded separately instead of merged into the GeoJSON
+    output_format = data.get("format", "geojson")
+    layer_urls = []
     default_crs = None
 
     for path in file_paths:
@@ -1899,147 +3209,34 @@ def process_geospatial_data(data):
             toolTipKey = f"{(os.path.basename(layer_name or file_path),os.path.basename(layer_name or file_path))}"
             # Check if the file is a shapefile (.shp)
             if file_type == "vector":
-                # Open GeoPackage or shapefile
-                dataset = ogr.Open(file_path)
-                if dataset is None:
-                    continue
-
-                if layer_name:
-                    layer = dataset.GetLayerByName(layer_name)
-                else:
-                    layer = dataset.GetLayer()
-
-                # Handle Spatial Reference System
-                source_srs = layer.GetSpatialRef()
-                if source_srs:
-                    authority_name = source_srs.GetAuthorityName(None)
-                    authority_code = source_srs.GetAuthorityCode(None)
-
-                    if authority_name and authority_code:
-                        default_crs = f"{authority_name}:{authority_code}"
-                    else:
-                        default_crs = "EPSG:4326"
-                else:
-                    source_srs = osr.SpatialReference()
-                    source_srs.ImportFromEPSG(
-                        26917
-                    )  # Default UTM Zone 17N if unspecified
-                    default_crs = "EPSG:26917"
-
-                target_srs = osr.SpatialReference()
-                target_srs.ImportFromEPSG(4326)  # WGS84 (longitude/latitude)
-
-                # Ensure the axis order is longitude-latitude
-                if target_srs.SetAxisMappingStrategy:
-                    target_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
-
-                coord_transform = osr.CoordinateTransformation(source_srs, target_srs)
-
-                # Create a new memory layer for the reprojected data
-                memory_driver = ogr.GetDriverByName("Memory")
-                memory_ds = memory_driver.CreateDataSource("reprojected")
-                reprojected_layer = memory_ds.CreateLayer(
-                    "reprojected_layer", srs=target_srs, geom_type=layer.GetGeomType()
+                converted = convert_vector_layer(
+                    path, file_path, layer_name, level, output_format
                 )
-
-                # Copy fields from the original layer
-                layer_defn = layer.GetLayerDefn()
-                for i in range(layer_defn.GetFieldCount()):
-                    reprojected_layer.CreateField(layer_defn.GetFieldDefn(i))
-
-                # Collect properties dynamically
-                properties = [
-                    layer_defn.GetFieldDefn(i).GetName()
-                    for i in range(layer_defn.GetFieldCount())
-                ]
-
-                # Reproject features in batches if needed
-                feature_buffer = []
-                BATCH_SIZE = 1000
-                for feature in layer:
-                    geom = feature.GetGeometryRef()
-                    if geom:
-                        geom.Transform(coord_transform)  # Transform geometry to WGS84
-
-                    # Create a new feature and store in buffer
-                    reprojected_feature = ogr.Feature(reprojected_layer.GetLayerDefn())
-                    reprojected_feature.SetGeometry(geom)
-                    for i in range(feature.GetFieldCount()):
-                        reprojected_feature.SetField(i, feature.GetField(i))
-
-                    feature_buffer.append(reprojected_feature)
-
-                    # Bulk insert when buffer reaches batch size
-                    if len(feature_buffer) >= BATCH_SIZE:
-                        reprojected_layer.StartTransaction()
-                        for f in feature_buffer:
-                            reprojected_layer.CreateFeature(f)
-                        reprojected_layer.CommitTransaction()
-                        feature_buffer.clear()
-
-                # Insert remaining features
-                if feature_buffer:
-                    reprojected_layer.StartTransaction()
-                    for f in feature_buffer:
-                        reprojected_layer.CreateFeature(f)
-                    reprojected_layer.CommitTransaction()
-
-                # Calculate bounds in WGS84
-                extent = reprojected_layer.GetExtent()  # (minX, maxX, minY, maxY)
-
-                x_min = extent[0]
-                y_min = extent[2]
-                x_max = extent[1]
-                y_max = extent[3]
-
-                # Swap longitude & latitude order for Leaflet (Leaflet expects [[minY, minX], [maxY, maxX]])
-                bounds = [
-                    [y_min, x_min],
-                    [y_max, x_max],
-                ]
-
-                shp_metadata = {
-                    "feature_count": reprojected_layer.GetFeatureCount(),
-                    "extent": (
-                        round(x_min, 6),
-                        round(x_max, 6),
-                        round(y_min, 6),
-                        round(y_max, 6),
-                    ),
-                    "field_names": properties,
-                }
-                geojson_metadata = {}
-                geojson_path = os.path.join(
-                    Config.TEMPDIR,
-                    os.path.basename(layer_name or file_path) + "_output.geojson",
-                )
-
-                # Check if a GeoJSON file already exists and extract metadata
-                if os.path.exists(geojson_path):
-                    geojson_metadata = get_geojson_metadata(geojson_path)
-
-                if shp_metadata != geojson_metadata:
-                    # Convert reprojected layer to GeoJSON
-                    geojson_driver = ogr.GetDriverByName("GeoJSON")
-
-                    geojson_dataset = geojson_driver.CreateDataSource(geojson_path)
-                    geojson_dataset.CopyLayer(
-                        reprojected_layer,
-                        "layer",
-                        ["RFC7946=YES", "WRITE_BBOX=YES"],
-                    )
-                    geojson_dataset = None
-
-                with open(geojson_path, "r") as file:
-                    geojson_data = json.load(file)
+                if converted is None:
+                    continue
+                layer_path, layer_metadata = converted
+                bounds = layer_metadata["bounds"]
+                properties = layer_metadata["properties"]
+                default_crs = layer_metadata["default_crs"]
 
                 # Update the combined bounds
                 (overlap, combined_bounds) = bounds_overlap_or_similar(
                     combined_bounds, bounds
                 )
 
-                # Add GeoJSON data/properties to the combined GeoJSON/properties only if the combined bounds are not far apart
-                if overlap:
+                # Add the layer (GeoJSON features or FlatGeobuf URL) and its properties only if the combined bounds are not far apart
+                if overlap and output_format == "fgb":
+                    layer_file = os.path.basename(layer_path)
+                    layer_urls.append(
+                        {
+                            "url": f"/api/geospatial/layers/{layer_file}",
+                            "geometry_type": layer_metadata.get("geometry_type"),
+                        }
+                    )
+                elif overlap:
+                    with open(layer_path, "r") as file:
+                        geojson_data = json.load(file)
+
                     if combined_geojson:
 
                         def append_features(geojson_data):
@@ -2052,10 +3249,20 @@ def process_geospatial_data(data):
                             combined_geojson["features"].append(feature)
                     else:
                         combined_geojson = geojson_data
+                if overlap:
                     if combined_properties:
                         combined_properties.extend(properties)
                     else:
                         combined_properties = properties
+                    # Vector tiles of the same layer, see render_vector_tile
+                    tile_layer = os.path.relpath(path, Config.PATHFILE).replace(
+                        "\\", "/"
+                    )
+                    if layer_name:
+                        tile_layer += ":" + layer_name
+                    vector_tile_urls.append(
+                        f"/api/tiles/vector/{tile_layer}/{{z}}/{{x}}/{{y}}.pbf"
+                    )
 
                 # Save properties for each shapefile path
                 tool_tip[toolTipKey] = properties
@@ -2089,18 +3296,39 @@ def process_geospatial_data(data):
                 if target_srs.SetAxisMappingStrategy:
                     target_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
+                # GeoPackage rasters are subdatasets of the source file
+                raster_layer = file_path if file_path != path else None
+
                 if not source_srs.IsSame(target_srs):
-                    # Reproject the raster to EPSG:4326
-                    reprojected_file_path = os.path.join(
-                        Config.TEMPDIR, os.path.basename(file_path) + "_reprojected.tif"
-                    )
-                    (
-                        gdal.Warp(
-                            reprojected_file_path, raster_dataset, dstSRS="EPSG:4326"
+
+                    def warp_raster(output_path):
+                        # A virtual warp: only the warp definition is written and
+                        # pixels are reprojected when windows of it are read
+                        warped = gdal.Warp(
+                            output_path,
+                            raster_dataset,
+                            format="VRT",
+                            dstSRS="EPSG:4326",
+                            multithread=True,
+                            warpOptions=[f"NUM_THREADS={Config.WARP_THREADS}"],
                         )
-                        if not os.path.exists(reprojected_file_path)
-                        else None
+                        if warped is None:
+                            return None
+                        # Close the dataset so it is written before it is cached
+                        warped = None
+                        return {}
+
+                    # Reproject the raster to EPSG:4326, once per source version
+                    reprojected = geo_cache.get_or_create(
+                        path,
+                        raster_layer,
+                        {"format": "vrt", "crs": "EPSG:4326"},
+                        ".vrt",
+                        warp_raster,
                     )
+                    if reprojected is None:
+                        continue
+                    reprojected_file_path = reprojected[0]
                     raster_dataset = gdal.Open(reprojected_file_path)
                 else:
                     reprojected_file_path = file_path
@@ -2119,36 +3347,42 @@ def process_geospatial_data(data):
                     [y_max, x_max],
                 ]
 
-                output_image_path = os.path.join(
-                    Config.TEMPDIR, os.path.basename(file_path) + "_rendered.png"
-                )
-
                 # Read raster data and render to an image
                 band = raster_dataset.GetRasterBand(1)  # Use the first raster band
                 # Get colormap based on metadata
                 cmap = get_metadata_colormap(band)
 
-                if not os.path.exists(output_image_path):
-                    raster_data, raster_normalized, _, _ = get_raster_normalized(band)
-
-                    rgba_colored = cmap(
-                        raster_normalized
-                    )  # Apply colormap (RGBA values)
-
-                    # Convert to uint8 format (0-255)
-                    rgba_image = (rgba_colored[:, :, :4] * 255).astype(np.uint8)
-
-                    # Set the alpha channel for transparency (No-data = Transparent)
-                    rgba_image[..., 3] = np.where(raster_data.mask, 0, 255)
-
-                    # Convert the RGBA array to an image
-                    color_ramp = Image.fromarray(rgba_image, mode="RGBA")
+                def render_raster(output_image_path):
+                    # The statistics are kept with the image, a cached image
+                    # needs no pixel reads. A warped VRT is read only once, at
+                    # the image size, and normalized with the image min and max.
+                    statistics = (
+                        get_band_statistics(band)
+                        if reprojected_file_path == file_path
+                        else None
+                    )
+                    return render_band_png(
+                        band, cmap, output_image_path, RASTER_IMAGE_SIZE, statistics
+                    )
 
-                    # Save the rendered image with transparency
-                    color_ramp.save(output_image_path, "PNG", quality=95)
+                rendered = geo_cache.get_or_create(
+                    path,
+                    raster_layer,
+                    {"format": "png", "crs": "EPSG:4326", "size": RASTER_IMAGE_SIZE},
+                    ".png",
+                    render_raster,
+                )
+                if rendered is None:
+                    continue
+                output_image_path, raster_statistics = rendered
+                if "min" not in raster_statistics:
+                    # Image rendered before the statistics were kept with it
+                    raster_statistics = get_band_statistics(band)
 
                 # Get color levels for the raster band
-                raster_color_levels = get_raster_color_levels(band, cmap)
+                raster_color_levels = get_raster_color_levels(
+                    raster_statistics["min"], raster_statistics["max"], cmap
+                )
 
                 raster_dataset = None
 
@@ -2162,6 +3396,15 @@ def process_geospatial_data(data):
                     image_urls.append(
                         f"/api/geotiff/{os.path.basename(output_image_path)}"
                     )
+                    # XYZ tiles of the same raster, see render_raster_tile
+                    tile_layer = os.path.relpath(path, Config.PATHFILE).replace(
+                        "\\", "/"
+                    )
+                    if raster_layer:
+                        tile_layer += ":" + raster_layer.rsplit(":", 1)[1]
+                    tile_urls.append(
+                        f"/api/tiles/raster/{tile_layer}/{{z}}/{{x}}/{{y}}.png"
+                    )
             else:
                 return {
                     "error": "Unsupported file type. Only .shp and .tif/.tiff are supported."
@@ -2184,6 +3427,12 @@ def process_geospatial_data(data):
         combined_geojson["features"] = sorted(
             combined_geojson["features"], key=get_geometry_order
         )
+    # Polygon layers first, like the features of the GeoJSON
+    layer_urls.sort(
+        key=lambda layer: get_geometry_order(
+            {"geometry": {"type": layer["geometry_type"]}}
+        )
+    )
     return {
         "geojson": combined_geojson,
         "bounds": combined_bounds,
@@ -2199,6 +3448,12 @@ def process_geospatial_data(data):
         "raster_levels": raster_color_levels,
         "properties": combined_properties,
         "image_urls": image_urls,
+        "tile_urls": tile_urls,
+        "vector_tile_urls": vector_tile_urls,
+        "layer_urls": layer_urls,
+        "simplification": (
+            {"tolerance": level[0], "precision": level[1]} if level else None
+        ),
         "tooltip": tool_tip,
     }
 
@@ -2237,9 +3492,11 @@ def export_map_service(image, form_data):
                 dataset = gdal.Open(file_path)
                 band = dataset.GetRasterBand(1)
                 cmap = get_metadata_colormap(band)
-                raster_data, _, raster_min, raster_max = get_raster_normalized(band)
+                # Full resolution statistics, the figure only needs a preview
+                statistics = get_band_statistics(band)
+                raster_data = read_band_preview(band, RASTER_PREVIEW_SIZE)
                 # Normalize raster values
-                norm = mcolors.Normalize(vmin=raster_min, vmax=raster_max)
+                norm = mcolors.Normalize(vmin=statistics["min"], vmax=statistics["max"])
                 # Display raster
                 ax.imshow(raster_data, cmap=cmap, norm=norm, alpha=1)
                 # Add raster legend (Colorbar)
@@ -2570,57 +3827,73 @@ def convert_excels_to_db_service(excel_files, data):
 
             # If BMP, save the final DataFrame to the database
             if "BMP" in db_name and not df_final.empty:
-                conn = sqlite3.connect(db_path)
-                # Reorder columns to ensure consistent structure
-                cols = [
-                    "Date",
-                    "BMP_ID",
-                    "Organization",
-                    "Watershed",
-                    "Subwatershed",
-                    "BMP_Type",
-                    "Field_ID",
-                ]
-                cols = [c for c in cols if c in df_final.columns]
-                df_final = df_final[
-                    cols + [c for c in df_final.columns if c not in cols]
-                ]
-                if conflict_action == "replace":
-                    df_final.to_sql(
-                        f"{os.path.splitext(db_name)[0]}",
-                        conn,
-                        if_exists=conflict_action,
-                        index=False,
-                    )
-                else:
-                    safe_append_to_sql(
-                        df_final,
-                        f"{os.path.splitext(db_name)[0]}",
-                        conn,
-                        if_exists=conflict_action,
-                    )
-                conn.close()
+                with writing_databases([db_path]):
+                    conn = sqlite3.connect(db_path)
+                    # Reorder columns to ensure consistent structure
+                    cols = [
+                        "Date",
+                        "BMP_ID",
+                        "Organization",
+                        "Watershed",
+                        "Subwatershed",
+                        "BMP_Type",
+                        "Field_ID",
+                    ]
+                    cols = [c for c in cols if c in df_final.columns]
+                    df_final = df_final[
+                        cols + [c for c in df_final.columns if c not in cols]
+                    ]
+                    if conflict_action == "replace":
+                        df_final.to_sql(
+                            f"{os.path.splitext(db_name)[0]}",
+                            conn,
+                            if_exists=conflict_action,
+                            index=False,
+                        )
+                    else:
+                        safe_append_to_sql(
+                            df_final,
+                            f"{os.path.splitext(db_name)[0]}",
+                            conn,
+                            if_exists=conflict_action,
+                        )
+                    conn.close()
 
         # Final write of combined tables
         for db_name, db_path in results.items():
-            conn = sqlite3.connect(db_path)
-            if "BMP" in db_name:
-                continue
-            for table_name, df in combined_dfs.items():
-                df.dropna(how="all", inplace=True)
-                df.replace([r"^\s*$", r"(?i)^nan$"], np.nan, regex=True, inplace=True)
-                if conflict_action == "replace":
-                    df.to_sql(table_name, conn, if_exists=conflict_action, index=False)
-                else:
-                    safe_append_to_sql(df, table_name, conn, if_exists=conflict_action)
-            conn.close()
+            with writing_databases([db_path]):
+                conn = sqlite3.connect(db_path)
+                if "BMP" in db_name:
+                    continue
+                for table_name, df in combined_dfs.items():
+                    df.dropna(how="all", inplace=True)
+                    df.replace(
+                        [r"^\s*$", r"(?i)^nan$"], np.nan, regex=True, inplace=True
+                    )
+                    if conflict_action == "replace":
+                        df.to_sql(
+                            table_name, conn, if_exists=conflict_action, index=False
+                        )
+                    else:
+                        safe_append_to_sql(
+                            df, table_name, conn, if_exists=conflict_action
+                        )
+                conn.close()
 
         # Save Help Metadata
         if help_entries:
             help_df = pd.DataFrame(help_entries)
-            help_conn = sqlite3.connect(help_db_path)
-            help_df.to_sql("HelpMetadata", help_conn, if_exists="replace", index=False)
-            help_conn.close()
+            with writing_databases([help_db_path]):
+                help_conn = sqlite3.connect(help_db_path)
+                help_df.to_sql(
+                    "HelpMetadata", help_conn, if_exists="replace", index=False
+                )
+                help_conn.close()
+            invalidate_help_attributes()
+
+        # Index the ID and date columns of the written databases
+        for db_path in results.values():
+            schedule_index_advice(db_path, wait=True)
 
         return results
 
@@ -0,0 +1,119 @@
+"""
+Equivalent data requests must share their response cache and query result entries.
+The response cache keys are built without the GDAL bindings.
+
+Run from the backend folder: python -m pytest tests
+"""
+
+import os
+import sys
+import json
+import pytest
+from werkzeug.datastructures import ImmutableMultiDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from config import Config
+from cache_keys import request_data_files, response_cache_key
+
+DB_TABLES = [
+    {"db": "Hydro.db3", "table": "Daily"},
+    {"db": "Climate.db3", "table": "Rain"},
+]
+
+BASE_ARGS = [
+    ("db_tables", json.dumps(DB_TABLES)),
+    ("columns", json.dumps(["Flow", "Rain"])),
+    ("id", json.dumps(["1", "2", "10"])),
+    ("id_column", "ID"),
+    ("start_date", "2000-01-01"),
+    ("end_date", "2000-12-31"),
+    ("date_type", "Time"),
+    ("interval", "daily"),
+    ("method", "['Equal']"),
+    ("statistics", "['Average']"),
+]
+
+
+def keys(pairs):
+    """Return the response cache key of the arguments."""
+    return response_cache_key("/api/get_data", ImmutableMultiDict(pairs))[0]
+
+
+def replace(pairs, name, value):
+    return [(key, value if key == name else old) for key, old in pairs]
+
+
+def test_reordered_arguments_share_keys():
+    assert keys(BASE_ARGS) == keys(list(reversed(BASE_ARGS)))
+
+
+def test_json_whitespace_shares_keys():
+    compact = replace(
+        replace(BASE_ARGS, "db_tables", json.dumps(DB_TABLES, separators=(",", ":"))),
+        "id",
+        '[ "1",  "2","10" ]',
+    )
+    spaced = replace(BASE_ARGS, "columns", json.dumps(["Flow", "Rain"], indent=2))
+    assert keys(BASE_ARGS) == keys(compact) == keys(spaced)
+
+
+def test_id_order_and_duplicates_share_keys():
+    reordered = replace(BASE_ARGS, "id", json.dumps(["10", "1", "2"]))
+    duplicated = replace(BASE_ARGS, "id", json.dumps(["2", "1", "10", "2", "1"]))
+    assert keys(BASE_ARGS) == keys(reordered) == keys(duplicated)
+
+
+def test_dropped_defaults_share_keys():
+    defaults = {"id_column", "interval", "method"}
+    dropped = [(key, value) for key, value in BASE_ARGS if key not in defaults]
+    assert keys(BASE_ARGS) == keys(dropped)
+
+
+def test_different_requests_get_different_keys():
+    other_ids = replace(BASE_ARGS, "id", json.dumps(["1", "2"]))
+    other_statistics = replace(BASE_ARGS, "statistics", "['Maximum']")
+    assert len({keys(BASE_ARGS), keys(other_ids), keys(other_statistics)}) == 3
+
+
+def test_field_scale_reads_bmps(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PATHFILE", str(tmp_path))
+    bmp_db = tmp_path / "BMPs.db3"
+    bmp_db.write_bytes(b"bmps")
+    field = BASE_ARGS + [("spatial_scale", "field")]
+
+    files = request_data_files(ImmutableMultiDict(field), "BMPs.db3")
+    assert str(bmp_db) in files
+    assert str(bmp_db) not in request_data_files(ImmutableMultiDict(BASE_ARGS))
+
+    args = ImmutableMultiDict(field)
+    before = response_cache_key("/api/get_data", args, "BMPs.db3")[0]
+    bmp_db.write_bytes(b"updated bmps")
+    assert response_cache_key("/api/get_data", args, "BMPs.db3")[0] != before
+
+
+def test_query_result_keys_match_response_keys():
+    # The services need the GDAL bindings of the conda environment
+    pytest.importorskip("osgeo")
+    from services import query_result_key
+
+    reordered = replace(BASE_ARGS, "id", json.dumps(["10", "2", "1", "1"]))
+    other_ids = replace(BASE_ARGS, "id", json.dumps(["1", "2"]))
+    base = query_result_key(ImmutableMultiDict(BASE_ARGS))
+    assert query_result_key(ImmutableMultiDict(reordered)) == base
+    assert query_result_key(ImmutableMultiDict(other_ids)) != base
+
+
+def test_tile_sources_include_shapefile_sidecars(tmp_path):
+    # Tiles are cached by the geospatial cache, keyed by every file of the source
+    from geo_cache import GeoCache
+
+    shapefile = tmp_path / "fields.shp"
+    for ext in (".shp", ".shx", ".dbf", ".prj"):
+        (tmp_path / f"fields{ext}").write_bytes(b"v1")
+    geo_cache = GeoCache(str(tmp_path / "cache"), 1 << 20)
+    params = {"format": "fgb", "crs": "EPSG:3857"}
+
+    before = geo_cache._key(str(shapefile), None, params)
+    (tmp_path / "fields.dbf").write_bytes(b"new attributes")
+    assert geo_cache._key(str(shapefile), None, params) != before
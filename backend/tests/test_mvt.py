@@ -0,0 +1,209 @@
+"""
+The vector tile encoder must write valid Mapbox Vector Tile 2.1 layers.
+
+Run from the backend folder: python -m pytest tests
+"""
+
+import os
+import sys
+import struct
+from shapely.geometry import LineString, MultiPoint, Point, Polygon
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from mvt import (
+    CLOSE_PATH,
+    LINE_TO,
+    LINESTRING,
+    MOVE_TO,
+    POINT,
+    POLYGON,
+    encode_layer,
+    encode_tile,
+)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_fields(data):
+    """Decode a protobuf message as a list of (field, value) pairs."""
+    fields = []
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        else:
+            raise ValueError(f"Unexpected wire type {wire_type}")
+        fields.append((field, value))
+    return fields
+
+
+def read_packed(data):
+    values = []
+    pos = 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_commands(commands):
+    """Decode geometry commands to (command, [(x, y), ...]) in absolute coordinates."""
+    decoded = []
+    x = y = 0
+    pos = 0
+    while pos < len(commands):
+        command, count = commands[pos] & 7, commands[pos] >> 3
+        pos += 1
+        if command == CLOSE_PATH:
+            decoded.append((command, []))
+            continue
+        points = []
+        for _ in range(count):
+            x += unzigzag(commands[pos])
+            y += unzigzag(commands[pos + 1])
+            pos += 2
+            points.append((x, y))
+        decoded.append((command, points))
+    return decoded
+
+
+def decode_layer(tile):
+    """Decode the single layer of a tile to its fields and features."""
+    ((field, layer),) = read_fields(tile)
+    assert field == 3
+    layer_fields = read_fields(layer)
+    keys = [value.decode() for field, value in layer_fields if field == 3]
+    values = []
+    for field, value in layer_fields:
+        if field == 4:
+            ((value_type, raw),) = read_fields(value)
+            if value_type == 1:
+                values.append(raw.decode())
+            elif value_type == 3:
+                values.append(struct.unpack("<d", raw)[0])
+            elif value_type == 6:
+                values.append(unzigzag(raw))
+            else:
+                values.append(bool(raw))
+
+    features = []
+    for field, value in layer_fields:
+        if field != 2:
+            continue
+        feature = dict(read_fields(value))
+        tags = read_packed(feature.get(2, b""))
+        features.append(
+            {
+                "type": feature[3],
+                "properties": {
+                    keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)
+                },
+                "commands": decode_commands(read_packed(feature[4])),
+            }
+        )
+    return dict(layer_fields), features
+
+
+def encode(geometries, properties=None):
+    properties = properties or [{} for _ in geometries]
+    return decode_layer(encode_tile([encode_layer("layer", geometries, properties)]))
+
+
+def test_layer_header():
+    layer, _ = encode([Point(1, 2)])
+    assert layer[15] == 2
+    assert layer[1] == b"layer"
+    assert layer[5] == 4096
+
+
+def test_points_share_one_move_to():
+    _, (feature,) = encode([MultiPoint([(5, 5), (3, 8)])])
+    assert feature["type"] == POINT
+    assert feature["commands"] == [(MOVE_TO, [(5, 5), (3, 8)])]
+
+
+def test_negative_deltas_are_zigzag_encoded():
+    _, (feature,) = encode([LineString([(10, 10), (4, 20), (0, 1)])])
+    assert feature["type"] == LINESTRING
+    assert feature["commands"] == [
+        (MOVE_TO, [(10, 10)]),
+        (LINE_TO, [(4, 20), (0, 1)]),
+    ]
+
+    line = LineString([(2, 0), (0, 0)])
+    layer = dict(read_fields(encode_layer("layer", [line], [{}])))
+    feature = dict(read_fields(layer[2]))
+    # MoveTo(2, 0), LineTo(-2, 0): -2 is zigzag encoded as 3
+    assert read_packed(feature[4]) == [9, 4, 0, 10, 3, 0]
+
+
+def test_polygon_rings_are_closed_and_wound():
+    exterior = [(0, 0), (0, 10), (10, 10), (10, 0), (0, 0)]
+    hole = [(2, 2), (2, 4), (4, 4), (4, 2), (2, 2)]
+    _, (feature,) = encode([Polygon(exterior, [hole])])
+    assert feature["type"] == POLYGON
+    commands = feature["commands"]
+    assert [command for command, _ in commands] == [
+        MOVE_TO,
+        LINE_TO,
+        CLOSE_PATH,
+        MOVE_TO,
+        LINE_TO,
+        CLOSE_PATH,
+    ]
+
+    def area(points):
+        return sum(
+            x0 * y1 - x1 * y0
+            for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1])
+        )
+
+    # Exterior rings are clockwise in screen coordinates, interior rings not
+    exterior_points = commands[0][1] + commands[1][1]
+    hole_points = commands[3][1] + commands[4][1]
+    assert len(exterior_points) == 4 and len(hole_points) == 4
+    assert area(exterior_points) > 0
+    assert area(hole_points) < 0
+
+
+def test_collapsed_parts_and_empty_values_are_dropped():
+    tiny = Polygon([(0, 0), (0, 0.1), (0.1, 0.1), (0, 0)])
+    properties = [{"ID": 1}, {"ID": 2, "Name": "a", "Area": float("nan"), "X": None}]
+    _, features = encode([tiny, Point(1, 1)], properties)
+    assert len(features) == 1
+    assert features[0]["properties"] == {"ID": 2, "Name": "a"}
+
+
+def test_property_values_are_shared():
+    properties = [{"ID": -3, "Area": 1.5, "Wet": True}] * 2
+    _, features = encode([Point(1, 1), Point(2, 2)], properties)
+    assert [feature["properties"] for feature in features] == properties
+
+    layer = encode_layer("layer", [Point(1, 1), Point(2, 2)], properties)
+    assert sum(1 for field, _ in read_fields(layer) if field == 4) == 3
+
+
+def test_empty_layers_are_left_out():
+    assert encode_layer("layer", [Point(0, 0).buffer(0)], [{}]) == b""
+    assert encode_tile([b""]) == b""
@@ -0,0 +1,76 @@
+"""
+The column-wise rounding must give the values of the previous per-cell rounding.
+
+Run from the backend folder: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# The services need the GDAL bindings of the conda environment
+pytest.importorskip("osgeo")
+
+from services import round_df_except_latlon, round_numeric_values
+
+FRAME = pd.DataFrame(
+    {
+        "ID": [1, 2, 3, 4, 5, 6],
+        "Flow": [2.675, 1.005, 0.125, -0.004, np.nan, 1e307],
+        "Sed": [0.00015, 0.0012345, -0.00995, 0.01, 12.3456, 0.0],
+        "Mixed": [0.123456, "n/a", 7, None, 2.675, 0.004567],
+        "Latitude": [43.123456, 43.5, 44.0, 42.987654, 43.0, 43.1],
+    }
+)
+
+# Output of the per-cell rounding, round_numeric_values applied to every value
+EXPECTED = pd.DataFrame(
+    {
+        "ID": [1, 2, 3, 4, 5, 6],
+        "Flow": [2.67, 1.0, 0.12, -0.004, np.nan, 1e307],
+        "Sed": [0.0001, 0.0012, -0.01, 0.01, 12.35, 0.0],
+        "Mixed": [0.12, "n/a", 7, None, 2.67, 0.0046],
+        "Latitude": [43.123456, 43.5, 44.0, 42.987654, 43.0, 43.1],
+    }
+)
+
+
+def round_df_per_cell(df):
+    """Previous implementation, calling round_numeric_values once per cell."""
+    skip_cols = {"latitude", "longitude"}
+    return df.apply(
+        lambda col: (
+            col if col.name.lower() in skip_cols else col.apply(round_numeric_values)
+        )
+    )
+
+
+def test_matches_pinned_output():
+    pd.testing.assert_frame_equal(
+        round_df_except_latlon(FRAME), EXPECTED, check_exact=True
+    )
+
+
+def test_matches_per_cell_rounding():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "Runoff": rng.normal(10, 5, 100000),
+            "Sediment": rng.random(100000) * 0.02,
+            # Values whose scaled decimal is about halfway between two roundings
+            "Halfway": (rng.integers(0, 10**6, 100000) + 0.5) / 100,
+        }
+    )
+    pd.testing.assert_frame_equal(
+        round_df_except_latlon(df), round_df_per_cell(df), check_exact=True
+    )
+
+
+def test_leaves_the_input_unchanged():
+    df = FRAME.copy()
+    round_df_except_latlon(df)
+    pd.testing.assert_frame_equal(df, FRAME)
@@ -1,5 +1,6 @@
 import os
 import signal
+from services import query_results, invalidate_help_attributes
 
 
 def shutdown_server():
@@ -8,3 +9,5 @@ def shutdown_server():
 
 def clear_cache(cache):
     cache.clear()
+    query_results.clear()
+    invalidate_help_attributes()
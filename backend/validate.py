@@ -1,8 +1,30 @@
 from cerberus import Validator
 import re
 import os
+import ast
+import json
 from config import Config
 
+# ID list arguments whose order and duplicates do not change the result
+UNORDERED_ID_ARGS = ["id", "field_selected_ids"]
+
+# Argument values the services use when the argument is left out
+DEFAULT_ARGS = {
+    "id_column": "ID",
+    "interval": "daily",
+    "method": ["Equal"],
+    "statistics": ["None"],
+    "month": "",
+    "season": "",
+    "math_formula": "",
+    "filter": {},
+    "format": "records",
+    "cursor": "",
+    "feature": "value",
+    "feature_statistic": "mean",
+    "layer_names": {"GeoDB.gpkg": []},
+}
+
 
 def validate_request_args(schema, request_args):
     """
@@ -39,6 +61,53 @@ def validate_request_args(schema, request_args):
     return validator.document
 
 
+def parse_request_arg(value):
+    """Parse a JSON (or Python literal) argument, or return the stripped string."""
+    if not isinstance(value, str):
+        return value
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            return parse(value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            continue
+    return value.strip()
+
+
+def id_sort_key(value):
+    """Sort numeric IDs by value and other IDs after them by name."""
+    return (0, int(value), "") if value.lstrip("-").isdigit() else (1, 0, value)
+
+
+def canonical_request_args(request_args):
+    """
+    Build the canonical form of request arguments for cache keys: JSON values are
+    parsed and re-serialized with sorted keys, ID lists are sorted and deduplicated,
+    filter values are sorted, empty filters and default values are dropped.
+    Requests that differ only in argument order, JSON whitespace or quoting,
+    ID order or explicit defaults get the same canonical form.
+    """
+    canonical = {}
+    for key in request_args.keys():
+        value = parse_request_arg(request_args.get(key))
+
+        if key in UNORDERED_ID_ARGS and isinstance(value, list):
+            value = sorted({str(item).strip() for item in value}, key=id_sort_key)
+        elif key == "filter" and isinstance(value, dict):
+            value = {
+                column: sorted(
+                    {json.dumps(item, sort_keys=True) for item in values}
+                )
+                for column, values in value.items()
+                if values
+            }
+
+        if key in DEFAULT_ARGS and value == DEFAULT_ARGS[key]:
+            continue
+        canonical[key] = value
+
+    return json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+
+
 # Usage for the /api/get_data endpoint
 def validate_get_data_args(request_args):
     schema = {
@@ -123,6 +192,21 @@ def validate_get_data_args(request_args):
             "type": "string",
             "required": False,
         },
+        "format": {
+            "type": "string",
+            "required": False,
+            "allowed": ["records", "columnar", "arrow", "ndjson"],
+        },
+        "limit": {
+            "type": "string",
+            "required": False,
+            "regex": r"^[1-9]\d*$",
+        },
+        "cursor": {
+            "type": "string",
+            "required": False,
+            "regex": r"^[\w=-]*$",
+        },
     }
     return validate_request_args(schema, request_args)
 
@@ -266,10 +350,21 @@ def validate_get_table_details_args(request_args):
 
 # Usage for /api/geospatial endpoint
 def validate_geospatial_args(request_args):
-    schema = {"file_paths": {"type": "string", "required": True}}
+    schema = {
+        "file_paths": {"type": "string", "required": True},
+        "zoom": {"type": "string", "regex": r"^([0-9]|1[0-9]|2[0-4])$"},
+        "tolerance": {"type": "string", "regex": r"^\d*\.?\d+([eE]-?\d+)?$"},
+        "format": {"type": "string", "allowed": ["geojson", "fgb"]},
+    }
     return validate_request_args(schema, request_args)
 
 
+def validate_geospatial_layer_args(filename):
+    if not re.fullmatch(r"[0-9a-f]{64}\.fgb", filename):
+        return {"error": "Invalid geospatial layer."}
+    return {"filename": filename}
+
+
 # Usage for /api/export_map endpoint
 def validate_export_map_args(image, form_data):
     if not image.mimetype.startswith("image/"):
@@ -296,6 +391,26 @@ def validate_serve_tif_args(filename):
     return {"filename": filename}
 
 
+def validate_raster_tile_args(layer, z, x, y):
+    if re.search(r"(\.\.\/|\.\.\\)", layer):
+        return {"error": "Potential path traversal detected in parameter: layer"}
+    if not re.search(r"\.(tif|tiff)$|\.gpkg:[\w-]+$", layer, re.IGNORECASE):
+        return {"error": "Only .tif, .tiff or GeoPackage raster layers are allowed"}
+    if not 0 <= z <= 24 or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return {"error": "Invalid tile coordinates."}
+    return {"layer": layer, "z": z, "x": x, "y": y}
+
+
+def validate_vector_tile_args(layer, z, x, y):
+    if re.search(r"(\.\.\/|\.\.\\)", layer):
+        return {"error": "Potential path traversal detected in parameter: layer"}
+    if not re.search(r"\.shp$|\.gpkg:[\w-]+$", layer, re.IGNORECASE):
+        return {"error": "Only .shp or GeoPackage vector layers are allowed"}
+    if not 0 <= z <= 24 or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return {"error": "Invalid tile coordinates."}
+    return {"layer": layer, "z": z, "x": x, "y": y}
+
+
 def validate_convert_excels_to_db_args(data):
     schema = {
         "mapping": {"type": "string", "required": True},
@@ -0,0 +1,138 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from werkzeug.utils import safe_join
+from config import Config
+from services import (
+    get_files_and_folders,
+    get_table_names,
+    get_columns_and_time_range,
+    convert_vector_layer,
+    process_geospatial_data,
+    GEOJSON_LEVELS,
+)
+
+# Progress of the warm-up, reported by /api/ready
+warmup_status = {
+    "state": "idle",
+    "step": None,
+    "done": 0,
+    "total": 0,
+    "errors": [],
+    "started": None,
+    "finished": None,
+}
+_status_lock = threading.Lock()
+
+
+def _update_status(**changes):
+    with _status_lock:
+        warmup_status.update(changes)
+
+
+def _record_error(name, error):
+    with _status_lock:
+        warmup_status["errors"].append({"name": name, "error": str(error)})
+
+
+def get_warmup_status():
+    """Return a copy of the warm-up progress with the ready flag and percentage."""
+    with _status_lock:
+        status = {**warmup_status, "errors": list(warmup_status["errors"])}
+    # A server started without the warm-up answers every request synchronously
+    status["ready"] = status["state"] not in ("starting", "running")
+    if status["ready"]:
+        status["progress"] = 100
+    elif status["total"]:
+        status["progress"] = round(100 * status["done"] / status["total"])
+    else:
+        status["progress"] = 0
+    return status
+
+
+def warm_database(db_path):
+    """Scan the column names, time range and IDs of every table of a database."""
+    tables = get_table_names({"db_path": db_path})
+    if tables.get("error", None):
+        return tables
+    for table_name in tables["tables"]:
+        metadata = get_columns_and_time_range(db_path, table_name)
+        if metadata.get("error", None):
+            return {"error": f"{table_name}: {metadata['error']}"}
+    return {}
+
+
+def warm_layer(file_path):
+    """
+    Convert a shapefile to GeoJSON at full resolution and every simplification
+    level, or a raster to its rendered image.
+    """
+    if file_path.endswith(".shp"):
+        full_path = safe_join(Config.PATHFILE, file_path)
+        levels = [None] + [
+            (tolerance, precision) for _, tolerance, precision in GEOJSON_LEVELS
+        ]
+        for level in levels:
+            if convert_vector_layer(full_path, full_path, None, level) is None:
+                return {"error": "Cannot open the layer."}
+        return {}
+    return process_geospatial_data({"file_paths": json.dumps([file_path])})
+
+
+def run_warmup(folder_path):
+    """
+    Do the work of the first list_files, get_table_details and geospatial calls
+    for a watershed folder: discover its files and load the aliases, scan the
+    metadata of its tables and convert its shapefiles and rasters.
+    """
+    _update_status(state="running", step="discovery", started=time.time())
+    try:
+        listing = get_files_and_folders({"folder_path": folder_path})
+        if listing.get("error", None):
+            raise ValueError(listing["error"])
+
+        tasks = []
+        for entry in listing["files_and_folders"]:
+            name = entry["name"].replace("\\", "/")
+            if name.endswith(".db3") and "lookup" not in name:
+                tasks.append((name, warm_database))
+            elif name.endswith((".shp", ".tif", ".tiff")):
+                tasks.append((name, warm_layer))
+
+        _update_status(step="metadata and layers", total=len(tasks))
+        with ThreadPoolExecutor(
+            max_workers=Config.WARMUP_WORKERS, thread_name_prefix="warmup"
+        ) as executor:
+            futures = {executor.submit(task, name): name for name, task in tasks}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    if result.get("error", None):
+                        _record_error(futures[future], result["error"])
+                except Exception as e:
+                    _record_error(futures[future], e)
+                with _status_lock:
+                    warmup_status["done"] += 1
+    except Exception as e:
+        _record_error(folder_path, e)
+
+    _update_status(state="ready", step=None, finished=time.time())
+
+
+def start_warmup():
+    """Start the warm-up of the default watershed folder in a background thread."""
+    with _status_lock:
+        if warmup_status["state"] != "idle":
+            return
+        if not Config.WARMUP:
+            warmup_status["state"] = "disabled"
+            return
+        warmup_status["state"] = "starting"
+
+    threading.Thread(
+        target=run_warmup,
+        args=(Config.WARMUP_FOLDER,),
+        name="warmup",
+        daemon=True,
+    ).start()